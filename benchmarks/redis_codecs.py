@@ -0,0 +1,60 @@
+import argparse
+import random
+import string
+import time
+from datetime import datetime
+
+from roubi.memory.redis import decode_value, encode_value, msgpack
+
+
+def sample_payload(items: int) -> dict:
+    return {
+        "generatedAt": datetime.now().isoformat(),
+        "items": [
+            {
+                "id": index,
+                "name": "".join(random.choices(string.ascii_lowercase, k=12)),
+                "score": random.random(),
+                "tags": random.sample(["news", "social", "blog", "forum", "video"], 2),
+                "active": index % 2 == 0,
+            }
+            for index in range(items)
+        ],
+    }
+
+
+def bench(payload: dict, codec: str, compress_threshold: int, rounds: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        raw = encode_value(payload, codec=codec, compress_threshold=compress_threshold)
+    encode_time = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode_value(raw)
+    decode_time = (time.perf_counter() - start) / rounds
+    return {"size": len(raw), "encode": encode_time, "decode": decode_time}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare RedisRepository codecs")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    payload = sample_payload(args.items)
+    codecs = ["json", "pickle"] + (["msgpack"] if msgpack is not None else [])
+    print(f"{'codec':<20}{'size (B)':>12}{'encode (ms)':>14}{'decode (ms)':>14}")
+    for codec in codecs:
+        for threshold in (None, args.threshold):
+            result = bench(payload, codec, threshold, args.rounds)
+            label = f"{codec}+zlib" if threshold is not None else codec
+            print(
+                f"{label:<20}{result['size']:>12}"
+                f"{result['encode'] * 1000:>14.3f}{result['decode'] * 1000:>14.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from roubi.models.s3aws import ObjectMeta, ObjectRecord
+
+
+def sample_page(objects: int) -> dict:
+    now = datetime.now(timezone.utc)
+    contents = []
+    for index in range(objects):
+        if index % 50 == 0:
+            key, size = f"dataset/{index // 50}/", 0
+        else:
+            key, size = f"dataset/{index // 50}/part-{index:07d}.csv", 1024 + index
+        contents.append(
+            {
+                "Key": key,
+                "LastModified": now - timedelta(seconds=index),
+                "Size": size,
+                "StorageClass": "STANDARD",
+                "Owner": {"DisplayName": "roubi", "ID": "owner-id"},
+            }
+        )
+    return {"Contents": contents}
+
+
+def bench(page: dict, build, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        files = [
+            item
+            for item in map(build, page["Contents"])
+            if not item.isFolder and item.fileFormat not in ["cryptomancer", "trashinfo"]
+        ]
+    return (time.perf_counter() - start) / rounds, len(files)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare S3 listing representations")
+    parser.add_argument("--objects", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    page = sample_page(args.objects)
+    print(f"{'mode':<16}{'files':>10}{'time (ms)':>14}{'objects/s':>14}")
+    for label, build in (
+        ("ObjectMeta", ObjectMeta.model_validate),
+        ("ObjectRecord", ObjectRecord.from_content),
+    ):
+        elapsed, files = bench(page, build, args.rounds)
+        print(
+            f"{label:<16}{files:>10}{elapsed * 1000:>14.2f}"
+            f"{args.objects / elapsed:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,108 @@
-from pika import BlockingConnection
+import copy
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+import pika
+from pika import BasicProperties, BlockingConnection, spec
 from pika.credentials import PlainCredentials
 from pika.connection import ConnectionParameters
+from pika.exceptions import (
+    AMQPChannelError,
+    AMQPError,
+    AMQPConnectionError,
+    ChannelClosedByBroker,
+    ChannelWrongStateError,
+)
 from typica import BaseConnection, ConnectionMeta, ConnectionUriMeta
 
 
+# NOT_FOUND, ACCESS_REFUSED and PRECONDITION_FAILED
+_PERMANENT_CHANNEL_ERRORS = {403, 404, 406}
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class _ConfirmChannel:
+    # BlockingChannel waits for every single publisher confirm. Pipelining a
+    # batch needs the asynchronous channel behind it (BlockingChannel._impl) and
+    # the close reason BlockingChannel records (_closing_reason). Both are pika
+    # internals the ^1.3 pin does not protect, so they are only touched here and
+    # checked up front to fail loudly if a release moves them.
+    def __init__(self, channel, on_confirm: Callable, on_ready: Callable) -> None:
+        impl = getattr(channel, "_impl", None)
+        if (
+            not hasattr(impl, "basic_publish")
+            or not hasattr(impl, "confirm_delivery")
+            or not hasattr(channel, "_closing_reason")
+        ):
+            raise RuntimeError(
+                f"pika {pika.__version__} does not expose the channel internals "
+                "needed for batched publisher confirms"
+            )
+        self.channel = channel
+        self._impl = impl
+        impl.confirm_delivery(ack_nack_callback=on_confirm, callback=on_ready)
+
+    @property
+    def is_open(self) -> bool:
+        return self.channel.is_open
+
+    @property
+    def is_closed(self) -> bool:
+        return self.channel.is_closed
+
+    @property
+    def closing_reason(self) -> Exception | None:
+        return self.channel._closing_reason
+
+    def publish(self, **kwargs) -> None:
+        self._impl.basic_publish(**kwargs)
+
+
 class BrokerRepository(BaseConnection):
     def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
         super().__init__(metadata)
         try:
-            self.client = BlockingConnection(
-                ConnectionParameters(
-                    host=self._metadata.host,
-                    port=self._metadata.port,
-                    virtual_host=self._metadata.database,
-                    credentials=PlainCredentials(
-                        username=self._metadata.username,
-                        password=self._metadata.password,
-                    ),
-                    heartbeat=60,
-                    blocked_connection_timeout=360,
-                    **kwargs
-                )
+            self._parameters = ConnectionParameters(
+                host=self._metadata.host,
+                port=self._metadata.port,
+                virtual_host=self._metadata.database,
+                credentials=PlainCredentials(
+                    username=self._metadata.username,
+                    password=self._metadata.password,
+                ),
+                heartbeat=60,
+                blocked_connection_timeout=360,
+                **kwargs
             )
+            self.client = BlockingConnection(self._parameters)
             self.channel = self.client.channel()
+            self._confirm_channel = None
+            self._stop_consuming = threading.Event()
         except Exception:
             raise
 
     def close(self) -> None:
         self.client.close()
 
+    def reconnect(self) -> None:
+        try:
+            if self.client.is_open:
+                self.client.close()
+        except AMQPConnectionError:
+            pass
+        self.client = BlockingConnection(self._parameters)
+        self.channel = self.client.channel()
+        self._confirm_channel = None
+
     def declare_exchange(self, exchange: str, **kwargs) -> None:
         try:
             if self.client == False:
@@ -59,3 +133,288 @@ class BrokerRepository(BaseConnection):
             )
         except Exception:
             raise
+
+    def send_batch(
+        self,
+        exchange: str,
+        routing_key: str,
+        messages: Iterable[str | bytes],
+        batch_size: int = 500,
+        delivery_mode: int = 2,
+        properties: BasicProperties = None,
+        mandatory: bool = False,
+        confirm_timeout: float = 30,
+        max_reconnects: int = 3,
+        on_batch: Callable[[dict], None] = None,
+    ) -> dict:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            if properties is None:
+                properties = BasicProperties(delivery_mode=delivery_mode)
+            elif properties.delivery_mode is None:
+                # Never mutate the caller's properties object
+                properties = copy.copy(properties)
+                properties.delivery_mode = delivery_mode
+
+            summary = {"published": 0, "nacked": [], "batches": 0, "elapsed": 0.0}
+            for index, batch in enumerate(_chunked(messages, batch_size)):
+                start = time.monotonic()
+                nacked = self._publish_confirmed(
+                    exchange,
+                    routing_key,
+                    batch,
+                    properties,
+                    mandatory,
+                    confirm_timeout,
+                    max_reconnects,
+                )
+                elapsed = time.monotonic() - start
+                report = {
+                    "batch": index,
+                    "published": len(batch) - len(nacked),
+                    "nacked": nacked,
+                    "elapsed": elapsed,
+                    "messagesPerSecond": len(batch) / elapsed if elapsed else 0.0,
+                }
+                summary["batches"] += 1
+                summary["published"] += report["published"]
+                summary["nacked"].extend(nacked)
+                summary["elapsed"] += elapsed
+                if on_batch:
+                    on_batch(report)
+
+            summary["messagesPerSecond"] = (
+                summary["published"] / summary["elapsed"] if summary["elapsed"] else 0.0
+            )
+            return summary
+        except Exception:
+            raise
+
+    def _publish_confirmed(
+        self,
+        exchange: str,
+        routing_key: str,
+        batch: list[str | bytes],
+        properties: BasicProperties,
+        mandatory: bool,
+        confirm_timeout: float,
+        max_reconnects: int,
+    ) -> list[str | bytes]:
+        remaining = list(batch)
+        carried = []
+        attempts = 0
+        while True:
+            pending, nacked, sent = None, [], 0
+            try:
+                channel, state = self._get_confirm_channel()
+                pending, nacked = OrderedDict(), []
+                state["pending"], state["nacked"] = pending, nacked
+                for message in remaining:
+                    channel.publish(
+                        exchange=exchange,
+                        routing_key=routing_key,
+                        body=message,
+                        properties=properties,
+                        mandatory=mandatory,
+                    )
+                    state["tag"] += 1
+                    pending[state["tag"]] = message
+                    sent += 1
+
+                deadline = time.monotonic() + confirm_timeout
+                while pending and time.monotonic() < deadline:
+                    self.client.process_data_events(time_limit=0.05)
+                    if channel.is_closed:
+                        raise channel.closing_reason or ChannelWrongStateError(
+                            "Channel closed while waiting for confirms"
+                        )
+                # Messages without a confirm before the timeout count as nacked
+                return carried + nacked + list(pending.values())
+            except (AMQPConnectionError, AMQPChannelError) as error:
+                # Missing exchange, access refused and the like will not heal on retry
+                if (
+                    isinstance(error, ChannelClosedByBroker)
+                    and error.reply_code in _PERMANENT_CHANNEL_ERRORS
+                ):
+                    raise
+                attempts += 1
+                if attempts > max_reconnects:
+                    raise
+                time.sleep(min(2**attempts, 30))
+                self.reconnect()
+            # Republish whatever the broker has not confirmed yet plus everything
+            # the loop never reached, keeping nacks seen before the failure
+            carried.extend(nacked)
+            unconfirmed = list(pending.values()) if pending else []
+            remaining = unconfirmed + remaining[sent:]
+
+    def _get_confirm_channel(self) -> tuple:
+        if self._confirm_channel is not None and self._confirm_channel[0].is_open:
+            return self._confirm_channel
+
+        channel = self.client.channel()
+        state = {"tag": 0, "pending": OrderedDict(), "nacked": [], "ready": False}
+
+        def on_confirm(frame) -> None:
+            method = frame.method
+            if method.multiple:
+                tags = [tag for tag in state["pending"] if tag <= method.delivery_tag]
+            else:
+                tags = [method.delivery_tag]
+            for tag in tags:
+                message = state["pending"].pop(tag, None)
+                if message is not None and isinstance(method, spec.Basic.Nack):
+                    state["nacked"].append(message)
+
+        def on_select_ok(frame) -> None:
+            state["ready"] = True
+
+        channel = _ConfirmChannel(channel, on_confirm, on_select_ok)
+        while not state["ready"]:
+            self.client.process_data_events(time_limit=0.05)
+        self._confirm_channel = (channel, state)
+        return self._confirm_channel
+
+    def stop_consuming(self) -> None:
+        self._stop_consuming.set()
+
+    def consume(
+        self,
+        queue: str,
+        handler: Callable[[bytes, BasicProperties], None],
+        prefetch: int = 100,
+        workers: int = 4,
+        use_process: bool = False,
+        ack_batch: int = 50,
+        ack_interval: float = 1.0,
+        dead_letter_exchange: str = None,
+        dead_letter_routing_key: str = None,
+        requeue_on_failure: bool = False,
+        drain_timeout: float = 30,
+        stop_event: threading.Event = None,
+    ) -> dict:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            stop = stop_event if stop_event else self._stop_consuming
+            if stop_event is None:
+                # A caller-owned event may already carry a stop request
+                self._stop_consuming.clear()
+            channel = self.client.channel()
+            channel.basic_qos(prefetch_count=prefetch)
+            executor = (
+                ProcessPoolExecutor(max_workers=workers)
+                if use_process
+                else ThreadPoolExecutor(max_workers=workers)
+            )
+            stats = {"consumed": 0, "acked": 0, "failed": 0, "deadLettered": 0}
+            # Delivery tag -> settled flag, in delivery order
+            outstanding: OrderedDict[int, bool] = OrderedDict()
+            ack_state = {"tag": 0, "count": 0}
+
+            def flush_acks() -> None:
+                if ack_state["tag"] and channel.is_open:
+                    channel.basic_ack(delivery_tag=ack_state["tag"], multiple=True)
+                    stats["acked"] += ack_state["count"]
+                ack_state["tag"], ack_state["count"] = 0, 0
+
+            def flush_on_timer() -> None:
+                flush_acks()
+                if not stop.is_set():
+                    self.client.call_later(ack_interval, flush_on_timer)
+
+            dead_letter = {"channel": None}
+
+            def publish_dead_letter(method, properties, body: bytes, error) -> bool:
+                # Confirmed and mandatory, so the original is only acked once the
+                # broker has actually routed its dead letter
+                if dead_letter["channel"] is None or not dead_letter["channel"].is_open:
+                    dead_letter["channel"] = self.client.channel()
+                    dead_letter["channel"].confirm_delivery()
+                try:
+                    dead_letter["channel"].basic_publish(
+                        exchange=dead_letter_exchange,
+                        routing_key=dead_letter_routing_key
+                        if dead_letter_routing_key is not None
+                        else method.routing_key,
+                        body=body,
+                        properties=BasicProperties(
+                            headers={
+                                **((properties.headers or {}) if properties else {}),
+                                "x-exception": repr(error),
+                                "x-original-queue": queue,
+                            },
+                            delivery_mode=properties.delivery_mode if properties else 2,
+                        ),
+                        mandatory=True,
+                    )
+                    return True
+                except AMQPError:
+                    return False
+
+            def settle(tag: int, method, properties, body: bytes, error=None) -> None:
+                if error is None:
+                    outstanding[tag] = True
+                elif dead_letter_exchange is not None and publish_dead_letter(
+                    method, properties, body, error
+                ):
+                    stats["failed"] += 1
+                    stats["deadLettered"] += 1
+                    outstanding[tag] = True
+                else:
+                    channel.basic_nack(delivery_tag=tag, requeue=requeue_on_failure)
+                    stats["failed"] += 1
+                    outstanding.pop(tag, None)
+
+                # A multiple ack only covers the contiguous settled prefix
+                while outstanding:
+                    first_tag, settled = next(iter(outstanding.items()))
+                    if not settled:
+                        break
+                    outstanding.popitem(last=False)
+                    ack_state["tag"] = first_tag
+                    ack_state["count"] += 1
+                if ack_state["count"] >= ack_batch:
+                    flush_acks()
+
+            def on_message(ch, method, properties, body: bytes) -> None:
+                stats["consumed"] += 1
+                outstanding[method.delivery_tag] = False
+
+                def done(future: Future) -> None:
+                    error = future.exception()
+                    self.client.add_callback_threadsafe(
+                        lambda: settle(
+                            method.delivery_tag, method, properties, body, error
+                        )
+                    )
+
+                executor.submit(handler, body, properties).add_done_callback(done)
+
+            consumer_tag = channel.basic_consume(
+                queue=queue, on_message_callback=on_message
+            )
+            self.client.call_later(ack_interval, flush_on_timer)
+            try:
+                while not stop.is_set():
+                    self.client.process_data_events(time_limit=0.5)
+            finally:
+                # Graceful drain, undispatched prefetched messages are requeued by
+                # basic_cancel and in-flight handlers get drain_timeout to finish
+                if channel.is_open:
+                    channel.basic_cancel(consumer_tag)
+                deadline = time.monotonic() + drain_timeout
+                while outstanding and time.monotonic() < deadline:
+                    self.client.process_data_events(time_limit=0.1)
+                flush_acks()
+                executor.shutdown(wait=True, cancel_futures=True)
+                if channel.is_open:
+                    channel.close()
+                if dead_letter["channel"] is not None and dead_letter["channel"].is_open:
+                    dead_letter["channel"].close()
+            return stats
+        except Exception:
+            raise
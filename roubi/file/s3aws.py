@@ -1,15 +1,115 @@
+import io
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable, Iterator
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
-from pydantic import TypeAdapter
 from typica import BaseConnection, ConnectionMeta, ConnectionUriMeta, BaseModel
 
 
-from roubi.models.s3aws import listObjectRes, ObjectMeta
+from roubi.models.s3aws import ObjectMeta, ObjectRecord
+from roubi.utils import merge_iterators
+
+
+class TransferProgress:
+    def __init__(
+        self, total: int = None, on_progress: Callable[[dict], None] = None
+    ) -> None:
+        self.total = total
+        self.on_progress = on_progress
+        self.transferred = 0
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, amount: int) -> None:
+        with self._lock:
+            self.transferred += amount
+            report = self.report()
+        if self.on_progress:
+            self.on_progress(report)
+
+    def report(self) -> dict:
+        elapsed = time.monotonic() - self._start
+        return {
+            "transferred": self.transferred,
+            "total": self.total,
+            "elapsed": elapsed,
+            "bytesPerSecond": self.transferred / elapsed if elapsed else 0.0,
+        }
+
+
+class S3ObjectReader(io.RawIOBase):
+    def __init__(
+        self, client, bucket: str, key: str, size: int, buffer_size: int = 8 * 1024 * 1024
+    ) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.buffer_size = buffer_size
+        self._position = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(0, min(offset, self.size))
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        if self._position >= self.size or not len(view):
+            return 0
+
+        offset = self._position - self._buffer_start
+        if not 0 <= offset < len(self._buffer):
+            end = min(self._position + max(self.buffer_size, len(view)), self.size) - 1
+            self._buffer = self.client.get_object(
+                Bucket=self.bucket, Key=self.key, Range=f"bytes={self._position}-{end}"
+            )["Body"].read()
+            self._buffer_start, offset = self._position, 0
+
+        amount = min(len(view), len(self._buffer) - offset)
+        view[:amount] = self._buffer[offset : offset + amount]
+        self._position += amount
+        return amount
 
 
 class S3AWSRepository(BaseConnection):
-    def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
+    def __init__(
+        self,
+        metadata: ConnectionMeta | ConnectionUriMeta,
+        meta_cache_ttl: float = 5,
+        meta_cache_size: int = 10000,
+        **kwargs,
+    ) -> None:
         super().__init__(metadata)
+        self.meta_cache_ttl = meta_cache_ttl
+        self.meta_cache_size = meta_cache_size
+        self._meta_cache: OrderedDict[tuple[str, str], tuple[float, ObjectMeta | None]] = (
+            OrderedDict()
+        )
+        self._meta_lock = threading.Lock()
         try:
             self.client = boto3.client(
                 "s3",
@@ -36,38 +136,371 @@ class S3AWSRepository(BaseConnection):
             if self.client == False:
                 raise ValueError("Fail connect")
 
-            self.client.get_object(Bucket=bucket if bucket else self.bucket, Key=key)
-            return True
+            return self.stat(key, bucket) is not None
         except ClientError as e:
             return False
 
+    def stat(self, key: str, bucket: str = None) -> ObjectMeta | None:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            bucket = bucket if bucket else self.bucket
+            cache_key = (bucket, key)
+            with self._meta_lock:
+                item = self._meta_cache.get(cache_key)
+                if item is not None and item[0] > time.monotonic():
+                    return item[1]
+
+            try:
+                response = self.client.head_object(Bucket=bucket, Key=key)
+                result = ObjectMeta.model_validate(
+                    {
+                        "Key": key,
+                        "LastModified": response["LastModified"],
+                        "Size": response["ContentLength"],
+                        "StorageClass": response.get("StorageClass", "STANDARD"),
+                    }
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in (
+                    "404",
+                    "NoSuchKey",
+                    "NotFound",
+                ):
+                    raise
+                result = None
+
+            if self.meta_cache_ttl:
+                with self._meta_lock:
+                    self._meta_cache[cache_key] = (
+                        time.monotonic() + self.meta_cache_ttl,
+                        result,
+                    )
+                    self._meta_cache.move_to_end(cache_key)
+                    while len(self._meta_cache) > self.meta_cache_size:
+                        self._meta_cache.popitem(last=False)
+            return result
+        except ClientError as e:
+            raise
+
+    def stat_many(
+        self, keys: list[str], bucket: str = None, workers: int = 16
+    ) -> dict[str, ObjectMeta | None]:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(keys, executor.map(lambda key: self.stat(key, bucket), keys)))
+
+    def check_many(
+        self, keys: list[str], bucket: str = None, workers: int = 16
+    ) -> dict[str, bool]:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(
+                zip(
+                    keys,
+                    executor.map(lambda key: self.check_accessible(key, bucket), keys),
+                )
+            )
+
+    def invalidate_meta(self, key: str = None, bucket: str = None) -> None:
+        with self._meta_lock:
+            if key is None:
+                self._meta_cache.clear()
+            else:
+                self._meta_cache.pop((bucket if bucket else self.bucket, key), None)
+
+    def _transfer_config(self, part_size: int, concurrency: int) -> TransferConfig:
+        return TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=concurrency,
+            use_threads=concurrency > 1,
+        )
+
+    def head(self, key: str, bucket: str = None) -> dict:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            return self.client.head_object(
+                Bucket=bucket if bucket else self.bucket, Key=key
+            )
+        except ClientError as e:
+            raise
+
+    def upload(
+        self,
+        source: str | BinaryIO,
+        key: str,
+        bucket: str = None,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 8,
+        on_progress: Callable[[dict], None] = None,
+        extra_args: dict = None,
+    ) -> dict:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            total = os.path.getsize(source) if isinstance(source, str) else None
+            progress = TransferProgress(total, on_progress)
+            params = {
+                "Bucket": bucket if bucket else self.bucket,
+                "Key": key,
+                "ExtraArgs": extra_args,
+                "Config": self._transfer_config(part_size, concurrency),
+                "Callback": progress,
+            }
+            if isinstance(source, str):
+                self.client.upload_file(Filename=source, **params)
+            else:
+                self.client.upload_fileobj(Fileobj=source, **params)
+            self.invalidate_meta(key, bucket)
+            return progress.report()
+        except ClientError as e:
+            raise
+
+    def download(
+        self,
+        key: str,
+        destination: str | BinaryIO,
+        bucket: str = None,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 8,
+        on_progress: Callable[[dict], None] = None,
+    ) -> dict:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            bucket = bucket if bucket else self.bucket
+            progress = TransferProgress(
+                self.head(key, bucket)["ContentLength"], on_progress
+            )
+            params = {
+                "Bucket": bucket,
+                "Key": key,
+                "Config": self._transfer_config(part_size, concurrency),
+                "Callback": progress,
+            }
+            if isinstance(destination, str):
+                self.client.download_file(Filename=destination, **params)
+            else:
+                self.client.download_fileobj(Fileobj=destination, **params)
+            return progress.report()
+        except ClientError as e:
+            raise
+
+    def download_into(
+        self,
+        key: str,
+        buffer: bytearray | memoryview | mmap.mmap,
+        bucket: str = None,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 8,
+        on_progress: Callable[[dict], None] = None,
+        size: int = None,
+    ) -> dict:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            bucket = bucket if bucket else self.bucket
+            if size is None:
+                size = self.head(key, bucket)["ContentLength"]
+            view = memoryview(buffer).cast("B")
+            if len(view) < size:
+                raise ValueError(f"Buffer too small: {len(view)} < {size}")
+
+            progress = TransferProgress(size, on_progress)
+
+            def fetch(start: int) -> None:
+                end = min(start + part_size, size) - 1
+                body = self.client.get_object(
+                    Bucket=bucket, Key=key, Range=f"bytes={start}-{end}"
+                )["Body"]
+                offset = start
+                # Parts land straight in their slice of the caller's buffer
+                for chunk in body.iter_chunks(chunk_size=256 * 1024):
+                    view[offset : offset + len(chunk)] = chunk
+                    offset += len(chunk)
+                    progress(len(chunk))
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(fetch, range(0, size, part_size)))
+            return progress.report()
+        except ClientError as e:
+            raise
+
+    def download_mmap(
+        self,
+        key: str,
+        path: str,
+        bucket: str = None,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 8,
+        on_progress: Callable[[dict], None] = None,
+    ) -> dict:
+        size = self.head(key, bucket)["ContentLength"]
+        with open(path, "w+b") as file:
+            file.truncate(size)
+            if not size:
+                return TransferProgress(0).report()
+            with mmap.mmap(file.fileno(), size) as mapped:
+                report = self.download_into(
+                    key,
+                    mapped,
+                    bucket=bucket,
+                    part_size=part_size,
+                    concurrency=concurrency,
+                    on_progress=on_progress,
+                    size=size,
+                )
+                mapped.flush()
+        return report
+
+    def read_range(
+        self, key: str, start: int, end: int = None, bucket: str = None
+    ) -> bytes:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            byte_range = f"bytes={start}-{end if end is not None else ''}"
+            return self.client.get_object(
+                Bucket=bucket if bucket else self.bucket, Key=key, Range=byte_range
+            )["Body"].read()
+        except ClientError as e:
+            raise
+
+    def open_reader(
+        self, key: str, bucket: str = None, buffer_size: int = 8 * 1024 * 1024
+    ) -> io.BufferedReader:
+        bucket = bucket if bucket else self.bucket
+        size = self.head(key, bucket)["ContentLength"]
+        return io.BufferedReader(
+            S3ObjectReader(self.client, bucket, key, size, buffer_size),
+            buffer_size=64 * 1024,
+        )
+
+    def iter_pages(
+        self,
+        prefix: str = "",
+        delimiter: str = None,
+        bucket: str = None,
+        page_size: int = 1000,
+        fetch_owner: bool = False,
+    ) -> Iterator[dict]:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            params = {
+                "Bucket": bucket if bucket else self.bucket,
+                "Prefix": prefix,
+                "FetchOwner": fetch_owner,
+                "PaginationConfig": {"PageSize": page_size},
+            }
+            if delimiter:
+                params["Delimiter"] = delimiter
+            paginator = self.client.get_paginator("list_objects_v2")
+            yield from paginator.paginate(**params)
+        except ClientError as e:
+            raise
+
+    def iter_objects(
+        self,
+        prefix: str = "",
+        delimiter: str = None,
+        bucket: str = None,
+        page_size: int = 1000,
+        pages: bool = False,
+        fetch_owner: bool = False,
+        fast: bool = False,
+    ) -> Iterator[ObjectMeta | ObjectRecord | list[ObjectMeta | ObjectRecord]]:
+        build = ObjectRecord.from_content if fast else ObjectMeta.model_validate
+        for page in self.iter_pages(prefix, delimiter, bucket, page_size, fetch_owner):
+            objects = [
+                build(self._prefix_object(common["Prefix"]))
+                for common in page.get("CommonPrefixes", [])
+            ]
+            objects.extend(build(content) for content in page.get("Contents", []))
+            if pages:
+                yield objects
+            else:
+                yield from objects
+
+    def iter_objects_many(
+        self,
+        prefixes: list[str],
+        delimiter: str = None,
+        bucket: str = None,
+        page_size: int = 1000,
+        workers: int = 4,
+        pages: bool = False,
+        fast: bool = False,
+    ) -> Iterator[ObjectMeta | ObjectRecord | list[ObjectMeta | ObjectRecord]]:
+        readers = [
+            lambda prefix=prefix: self.iter_objects(
+                prefix, delimiter, bucket, page_size, pages=True, fast=fast
+            )
+            for prefix in prefixes
+        ]
+        with closing(merge_iterators(readers, workers)) as merged:
+            for page in merged:
+                if pages:
+                    yield page
+                else:
+                    yield from page
+
+    @staticmethod
+    def _prefix_object(prefix: str) -> dict:
+        return {
+            "Key": prefix,
+            "LastModified": datetime.fromtimestamp(0, tz=timezone.utc),
+            "Size": 0,
+            "StorageClass": "",
+        }
+
     def list_file(
         self,
         excludeFormat: list[str] = ["cryptomancer", "trashinfo"],
         bucket: str = None,
-    ) -> list[ObjectMeta]:
+        prefix: str = "",
+        fast: bool = False,
+        fetch_owner: bool = True,
+    ) -> list[ObjectMeta | ObjectRecord]:
         try:
             if self.client == False:
                 raise ValueError("Fail connect")
 
-            raw = TypeAdapter(listObjectRes).validate_python(
-                self.client.list_objects(Bucket=bucket if bucket else self.bucket)
-            )
-            return raw.filter_file(excludeFormat=excludeFormat)
+            return [
+                content
+                # list_objects returned owners by default, list_objects_v2 only on request
+                for content in self.iter_objects(
+                    prefix=prefix, bucket=bucket, fetch_owner=fetch_owner, fast=fast
+                )
+                if not content.isFolder and content.fileFormat not in excludeFormat
+            ]
         except ClientError as e:
             raise
 
     def list_folder(
         self,
         bucket: str = None,
-    ) -> list[ObjectMeta]:
+        prefix: str = "",
+        fast: bool = False,
+        fetch_owner: bool = True,
+    ) -> list[ObjectMeta | ObjectRecord]:
         try:
             if self.client == False:
                 raise ValueError("Fail connect")
 
-            raw = TypeAdapter(listObjectRes).validate_python(
-                self.client.list_objects(Bucket=bucket if bucket else self.bucket)
-            )
-            return raw.filter_folder()
+            return [
+                content
+                for content in self.iter_objects(
+                    prefix=prefix, bucket=bucket, fetch_owner=fetch_owner, fast=fast
+                )
+                if content.isFolder
+            ]
         except ClientError as e:
             raise
@@ -1,10 +1,118 @@
+import functools
+import hashlib
+import json
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
 from redis import Redis
+from redis.exceptions import LockError
 from typica import BaseConnection, ConnectionMeta, ConnectionUriMeta
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_MISSING = object()
+_HEADER = b"\x00rb"
+_COMPRESSED = 1
+_CODECS: dict[str, tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    "raw": (
+        0,
+        # Same coercion redis-py applies, bytes(int) would allocate zero bytes
+        lambda value: (
+            bytes(value)
+            if isinstance(value, (bytes, bytearray, memoryview))
+            else str(value).encode()
+        ),
+        lambda raw: raw,
+    ),
+    "json": (
+        1,
+        lambda value: json.dumps(value, separators=(",", ":"), default=str).encode(),
+        json.loads,
+    ),
+    "pickle": (
+        2,
+        lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+        pickle.loads,
+    ),
+    "msgpack": (
+        3,
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda raw: msgpack.unpackb(raw, raw=False),
+    ),
+}
+_CODEC_IDS = {codec_id: name for name, (codec_id, _, _) in _CODECS.items()}
+
+
+def encode_value(
+    value: Any,
+    codec: str = "raw",
+    compress_threshold: int = None,
+    compress_level: int = 6,
+) -> bytes:
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    if codec == "msgpack" and msgpack is None:
+        raise ImportError("msgpack codec requires msgpack to be installed")
+
+    codec_id, dumps, _ = _CODECS[codec]
+    payload = dumps(value)
+    flags = 0
+    if compress_threshold is not None and len(payload) >= compress_threshold:
+        payload = zlib.compress(payload, compress_level)
+        flags |= _COMPRESSED
+    return _HEADER + bytes((codec_id, flags)) + payload
+
+
+def decode_value(raw: bytes | str | None) -> Any:
+    if not isinstance(raw, bytes) or not raw.startswith(_HEADER):
+        return raw
+
+    codec_id, flags = raw[len(_HEADER)], raw[len(_HEADER) + 1]
+    payload = raw[len(_HEADER) + 2 :]
+    if flags & _COMPRESSED:
+        payload = zlib.decompress(payload)
+    name = _CODEC_IDS.get(codec_id)
+    if name is None:
+        raise ValueError(f"Unknown codec id: {codec_id}")
+    if name == "msgpack" and msgpack is None:
+        raise ImportError("msgpack codec requires msgpack to be installed")
+    return _CODECS[name][2](payload)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
 class RedisRepository(BaseConnection):
-    def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
+    def __init__(
+        self,
+        metadata: ConnectionMeta | ConnectionUriMeta,
+        codec: str = None,
+        compress_threshold: int = None,
+        compress_level: int = 6,
+        **kwargs,
+    ) -> None:
         super().__init__(metadata)
+        self.codec = codec
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self._compute_locks: dict[str, list] = {}
+        self._compute_guard = threading.Lock()
 
         try:
             if isinstance(self._metadata, ConnectionUriMeta) and self._metadata.uri:
@@ -23,12 +131,44 @@ class RedisRepository(BaseConnection):
     def close(self):
         self.client.close()
 
-    def add_data(self, key: str, value: str, expired: int = None):
+    def _encode(self, value: Any) -> Any:
+        if self.codec is None and self.compress_threshold is None:
+            return value
+        return encode_value(
+            value,
+            codec=self.codec if self.codec else "raw",
+            compress_threshold=self.compress_threshold,
+            compress_level=self.compress_level,
+        )
+
+    def add_data(self, key: str, value: Any, expired: int = None):
         try:
             if self.client == False:
                 raise ValueError("Fail connect")
 
-            self.client.set(name=key, value=value, ex=expired)
+            self.client.set(name=key, value=self._encode(value), ex=expired)
+        except Exception:
+            raise
+
+    def add_many(
+        self,
+        data: dict[str, Any],
+        expired: int | dict[str, int] = None,
+        chunk_size: int = 1000,
+    ) -> int:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            total = 0
+            for chunk in _chunked(data.items(), chunk_size):
+                pipe = self.client.pipeline(transaction=False)
+                for key, value in chunk:
+                    ex = expired.get(key) if isinstance(expired, dict) else expired
+                    pipe.set(name=key, value=self._encode(value), ex=ex)
+                pipe.execute()
+                total += len(chunk)
+            return total
         except Exception:
             raise
 
@@ -38,20 +178,165 @@ class RedisRepository(BaseConnection):
                 raise ValueError("Fail connect")
 
             result = self.client.get(name=key)
-            return result
+            return decode_value(result)
         except Exception:
             raise
 
-    def get_by_pattern(self, pattern: str):
+    def get_many(self, keys: Iterable[str], chunk_size: int = 1000) -> list:
         try:
             if self.client == False:
                 raise ValueError("Fail connect")
 
-            result = self.client.scan_iter(pattern)
+            result = []
+            for chunk in _chunked(keys, chunk_size):
+                result.extend(decode_value(raw) for raw in self.client.mget(chunk))
             return result
         except Exception:
             raise
 
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], str | bytes],
+        expired: int,
+        beta: float = 1.0,
+        stale_ttl: int = 0,
+        lock_timeout: int = 30,
+        wait_timeout: float = 10,
+        poll_interval: float = 0.05,
+    ):
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            value, meta = self.client.mget([key, f"{key}:meta"])
+            if value is not None:
+                value = decode_value(value)
+                if not self._should_refresh(meta, beta):
+                    return value
+                # Logically expired or picked for early refresh, only one caller
+                # recomputes and everybody else keeps serving the current value
+                result = self._compute_locked(
+                    key, compute, expired, stale_ttl, lock_timeout
+                )
+                return value if result is _MISSING else result
+
+            with self._local_lock(key):
+                deadline = time.monotonic() + wait_timeout
+                while True:
+                    value = self.client.get(key)
+                    if value is not None:
+                        return decode_value(value)
+                    result = self._compute_locked(
+                        key, compute, expired, stale_ttl, lock_timeout
+                    )
+                    if result is not _MISSING:
+                        return result
+                    if time.monotonic() >= deadline:
+                        return self._store_computed(key, compute, expired, stale_ttl)
+                    time.sleep(poll_interval)
+        except Exception:
+            raise
+
+    @staticmethod
+    def _should_refresh(meta: bytes | str | None, beta: float) -> bool:
+        if meta is None:
+            return False
+        if isinstance(meta, bytes):
+            meta = meta.decode()
+        expiry, delta = (float(item) for item in meta.split(":"))
+        # Probabilistic early expiration (XFetch), 1 - random() avoids log(0)
+        return time.time() - delta * beta * math.log(1 - random.random()) >= expiry
+
+    def _compute_locked(
+        self,
+        key: str,
+        compute: Callable[[], str | bytes],
+        expired: int,
+        stale_ttl: int,
+        lock_timeout: int,
+    ):
+        lock = self.client.lock(f"{key}:lock", timeout=lock_timeout)
+        if not lock.acquire(blocking=False):
+            return _MISSING
+        try:
+            return self._store_computed(key, compute, expired, stale_ttl)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
+
+    def _store_computed(
+        self,
+        key: str,
+        compute: Callable[[], str | bytes],
+        expired: int,
+        stale_ttl: int,
+    ):
+        start = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - start
+
+        encoded = self._encode(value)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(name=key, value=encoded, ex=expired + stale_ttl)
+        pipe.set(
+            name=f"{key}:meta",
+            value=f"{time.time() + expired}:{delta}",
+            ex=expired + stale_ttl,
+        )
+        pipe.execute()
+        return self._read_back(encoded)
+
+    def _read_back(self, encoded: Any) -> Any:
+        # Hand computed values back in the same shape a later cache hit returns
+        raw = (
+            bytes(encoded)
+            if isinstance(encoded, (bytes, bytearray, memoryview))
+            else str(encoded).encode()
+        )
+        if raw.startswith(_HEADER):
+            return decode_value(raw)
+        if self.client.get_connection_kwargs().get("decode_responses"):
+            return raw.decode()
+        return raw
+
+    @contextmanager
+    def _local_lock(self, key: str) -> Iterator[None]:
+        with self._compute_guard:
+            entry = self._compute_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._compute_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._compute_locks[key]
+
+    def get_by_pattern(
+        self, pattern: str, count: int = 1000, with_values: bool = False
+    ):
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            result = self.client.scan_iter(match=pattern, count=count)
+            if not with_values:
+                return result
+
+            values = {}
+            for chunk in _chunked(result, count):
+                values.update(
+                    (key, decode_value(raw))
+                    for key, raw in zip(chunk, self.client.mget(chunk))
+                )
+            return values
+        except Exception:
+            raise
+
     def remove_data(self, key: str):
         try:
             if self.client == False:
@@ -61,11 +346,179 @@ class RedisRepository(BaseConnection):
         except Exception:
             raise
 
-    def remove_by_pattern(self, pattern: str):
+    def remove_many(self, keys: Iterable[str], chunk_size: int = 1000) -> int:
         try:
             if self.client == False:
                 raise ValueError("Fail connect")
-            for key in self.client.scan_iter(pattern):
-                self.client.delete(key)
+
+            total = 0
+            for chunk in _chunked(keys, chunk_size):
+                total += self.client.unlink(*chunk)
+            return total
         except Exception:
             raise
+
+    def remove_by_pattern(
+        self, pattern: str, count: int = 1000, chunk_size: int = 1000
+    ) -> int:
+        try:
+            if self.client == False:
+                raise ValueError("Fail connect")
+
+            total = 0
+            keys = self.client.scan_iter(match=pattern, count=count)
+            pipe = self.client.pipeline(transaction=False)
+            for chunk in _chunked(keys, chunk_size):
+                pipe.unlink(*chunk)
+                if len(pipe) >= 10:
+                    total += sum(pipe.execute())
+            total += sum(pipe.execute())
+            return total
+        except Exception:
+            raise
+
+
+class TwoTierCache:
+    def __init__(
+        self,
+        repository: RedisRepository,
+        maxsize: int = 1024,
+        ttl: float = 60,
+        expired: int = None,
+        invalidation: str = "pubsub",
+        channel: str = "roubi:cache:invalidate",
+    ) -> None:
+        self.repository = repository
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.expired = expired
+        self.channel = channel
+        self.invalidation = invalidation
+        self.stats = {
+            "local": {"hits": 0, "misses": 0},
+            "redis": {"hits": 0, "misses": 0},
+        }
+        self._id = uuid.uuid4().hex
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pubsub = None
+        self._thread = None
+
+        if invalidation == "pubsub":
+            self._pubsub = repository.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{channel: self._on_message})
+        elif invalidation == "keyspace":
+            db = repository.client.connection_pool.connection_kwargs.get("db", 0)
+            self._pubsub = repository.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.psubscribe(**{f"__keyspace@{db}__:*": self._on_keyspace})
+        elif invalidation:
+            raise ValueError(f"Unknown invalidation mode: {invalidation}")
+        if self._pubsub is not None:
+            self._thread = self._pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] >= time.monotonic():
+                self._data.move_to_end(key)
+                self.stats["local"]["hits"] += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.stats["local"]["misses"] += 1
+
+        raw = self.repository.client.get(key)
+        if raw is None:
+            self.stats["redis"]["misses"] += 1
+            return default
+        value = decode_value(raw)
+        self.stats["redis"]["hits"] += 1
+        self._set_local(key, value)
+        return value
+
+    def set(self, key: str, value: Any, expired: int = None) -> None:
+        self.repository.add_data(
+            key, value, expired=expired if expired is not None else self.expired
+        )
+        self._publish(key)
+        self.invalidate_local(key)
+
+    def delete(self, key: str) -> None:
+        self.repository.remove_data(key)
+        self._publish(key)
+        self.invalidate_local(key)
+
+    def invalidate_local(self, key: str = None) -> None:
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def cached(
+        self,
+        expired: int = None,
+        prefix: str = "roubi:cached",
+        dumps: Callable[[Any], str] = None,
+        loads: Callable[[str | bytes], Any] = None,
+    ) -> Callable:
+        if self.repository.codec not in (None, "raw"):
+            # The repository codec already (de)serializes values
+            dumps = dumps if dumps else lambda value: value
+            loads = loads if loads else lambda value: value
+        else:
+            dumps = dumps if dumps else json.dumps
+            loads = loads if loads else json.loads
+
+        def decorator(func: Callable) -> Callable:
+            name = f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                raw = json.dumps([args, kwargs], sort_keys=True, default=str)
+                key = f"{prefix}:{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+                # A sentinel keeps cached None results from reading as misses
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    return loads(value)
+                result = func(*args, **kwargs)
+                self.set(key, dumps(result), expired=expired)
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def _set_local(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _publish(self, key: str) -> None:
+        # Keyspace notifications already reach every instance, skip the round trip
+        if self.invalidation == "pubsub" and self._pubsub is not None and self.channel:
+            self.repository.client.publish(self.channel, f"{self._id}:{key}")
+
+    def _on_message(self, message: dict) -> None:
+        data = message["data"]
+        if isinstance(data, bytes):
+            data = data.decode()
+        origin, _, key = data.partition(":")
+        if origin != self._id:
+            self.invalidate_local(key)
+
+    def _on_keyspace(self, message: dict) -> None:
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        self.invalidate_local(channel.split(":", 1)[1])
@@ -0,0 +1,22 @@
+from typica import BaseModel, Optional, Field
+
+
+class ExplainReport(BaseModel):
+    stages: list[str] = Field([])
+    indexesUsed: list[str] = Field([])
+    isCollscan: bool = Field(False)
+    nReturned: int = Field(0)
+    docsExamined: int = Field(0)
+    keysExamined: int = Field(0)
+    executionTimeMillis: int = Field(0)
+    suggestedIndex: list[tuple[str, int]] = Field([])
+    unindexableFilters: list[str] = Field(
+        [], description="Fields filtered by case-insensitive unanchored regex"
+    )
+    winningPlan: Optional[dict] = Field(None)
+
+    @property
+    def examined_ratio(self) -> float:
+        if not self.nReturned:
+            return float(self.docsExamined)
+        return self.docsExamined / self.nReturned
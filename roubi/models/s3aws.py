@@ -38,6 +38,64 @@ class ObjectMeta(BaseModel):
         return self.fileFormat in ["csv", "xls", "xlsx"]
 
 
+class ObjectRecord:
+    __slots__ = ("key", "size", "lastModified", "storageClass", "owner")
+
+    def __init__(
+        self,
+        key: str,
+        size: int,
+        lastModified: datetime,
+        storageClass: str = "",
+        owner: dict = None,
+    ) -> None:
+        self.key = key
+        self.size = size
+        self.lastModified = lastModified
+        self.storageClass = storageClass
+        self.owner = owner
+
+    @classmethod
+    def from_content(cls, content: dict) -> "ObjectRecord":
+        return cls(
+            content["Key"],
+            content["Size"],
+            content["LastModified"],
+            content.get("StorageClass", ""),
+            content.get("Owner"),
+        )
+
+    @property
+    def isFolder(self) -> bool:
+        return self.size == 0 and self.key.endswith("/")
+
+    @property
+    def fileFormat(self) -> str:
+        return self.key.rpartition(".")[2] if "." in self.key else ""
+
+    @property
+    def name(self) -> str:
+        return self.key.rpartition("/")[2]
+
+    @property
+    def is_dataframe(self):
+        return self.fileFormat in ["csv", "xls", "xlsx"]
+
+    def to_meta(self) -> ObjectMeta:
+        content = {
+            "Key": self.key,
+            "Size": self.size,
+            "LastModified": self.lastModified,
+            "StorageClass": self.storageClass,
+        }
+        if self.owner:
+            content["Owner"] = self.owner
+        return ObjectMeta.model_validate(content)
+
+    def __repr__(self) -> str:
+        return f"ObjectRecord(key={self.key!r}, size={self.size})"
+
+
 class listObjectRes(BaseModel):
     # marker: str = Field()
     contents: Optional[list[ObjectMeta]] = Field([], alias="Contents")
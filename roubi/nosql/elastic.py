@@ -1,11 +1,116 @@
 import re
+import threading
+import time
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Iterable, Iterator
 
 from elasticsearch7 import Elasticsearch, helpers
 from typica import BaseConnection, ConnectionMeta, ConnectionUriMeta
 
+from roubi.utils import merge_iterators
+
+
+INDEX_SUFFIX_PATTERN = re.compile(
+    r"(([-_]\d{13})|([-_]\d{4}([-_]\d{2}){1,2})|([-_]\d{4,8})|([-_]\d{1,3}))"
+)
+INDEX_NAME_PATTERN = re.compile(
+    r"([-\w]+([-_]\d{13})|[-\w]+([-_]\d{4}([-_]\d{2}){1,2})|[-\w]+([-_]\d{4,8})|[-\w]+([-_]\d{1,3}))"
+)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class IndexCatalog:
+    def __init__(
+        self, client: Elasticsearch, ttl: float = 0, use_cat: bool = False
+    ) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.use_cat = use_cat
+        self._classified: dict[str, tuple[str, bool] | None] = {}
+        self._entries: dict[str, tuple[float, frozenset[str], list[dict]]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, pattern: str = None) -> None:
+        with self._lock:
+            if pattern is None:
+                self._entries.clear()
+                self._classified.clear()
+            else:
+                self._entries.pop(pattern, None)
+
+    def list_indices(self, pattern: str) -> list[str]:
+        if self.use_cat:
+            rows = self.client.cat.indices(
+                index=pattern, h="index", format="json", expand_wildcards="open"
+            )
+            return [row["index"] for row in rows]
+        return list(self.client.indices.get_alias(index=pattern).keys())
+
+    def index_patterns(self, pattern: str, refresh: bool = False) -> list[dict]:
+        with self._lock:
+            entry = self._entries.get(pattern)
+        if entry and not refresh and entry[0] > time.monotonic():
+            return [dict(item) for item in entry[2]]
+
+        names = frozenset(self.list_indices(pattern))
+        with self._lock:
+            if entry and entry[1] == names:
+                result = entry[2]
+            else:
+                self._classify(names.difference(self._classified))
+                result = self._aggregate(names)
+            self._entries[pattern] = (time.monotonic() + self.ttl, names, result)
+            # Drop classifications of indices no cached pattern references anymore,
+            # otherwise rotated daily indices pile up for the life of the process
+            referenced = set().union(*(item[1] for item in self._entries.values()))
+            for index in self._classified.keys() - referenced:
+                del self._classified[index]
+        return [dict(item) for item in result]
+
+    def _classify(self, names: set[str]) -> None:
+        for index in names:
+            if "." in index or "{" in index:
+                self._classified[index] = None
+            elif INDEX_NAME_PATTERN.fullmatch(index):
+                self._classified[index] = (
+                    f"{INDEX_SUFFIX_PATTERN.sub('', index)}-*",
+                    True,
+                )
+            else:
+                self._classified[index] = (index, False)
+
+    def _aggregate(self, names: frozenset[str]) -> list[dict]:
+        indices = {}
+        for index in sorted(names):
+            item = self._classified.get(index)
+            if item is None:
+                continue
+            clean_index, is_pattern = item
+            total = indices[clean_index]["totalIndex"] + 1 if clean_index in indices else 1
+            indices[clean_index] = {
+                "indexName": index,
+                "cleanIndexName": clean_index,
+                "totalIndex": total,
+                "isIndexPattern": is_pattern,
+            }
+        return list(indices.values())
+
 
 class ElasticRepository(BaseConnection):
-    def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
+    def __init__(
+        self,
+        metadata: ConnectionMeta | ConnectionUriMeta,
+        catalog_ttl: float = 0,
+        catalog_use_cat: bool = False,
+        **kwargs,
+    ) -> None:
         super().__init__(metadata)
 
         
@@ -18,47 +123,189 @@ class ElasticRepository(BaseConnection):
                 _client_host = f"http://{self._metadata.host}:{self._metadata.port}/"
                 
         self.client: Elasticsearch = Elasticsearch(_client_host, **kwargs)
+        self.catalog = IndexCatalog(self.client, ttl=catalog_ttl, use_cat=catalog_use_cat)
         
     
     def close(self):
         self.client.close()
 
     
-    def get_manual_index_pattern(self, database: str = '*') -> list:
+    def get_manual_index_pattern(self, database: str = '*', refresh: bool = False) -> list:
         try:
             if not self.client:
                 raise ValueError("Fail connect")
-            regex_formula = (
-                r"(([-_]\d{13})|([-_]\d{4}([-_]\d{2}){1,2})|([-_]\d{4,8})|([-_]\d{1,3}))"
+            return self.catalog.index_patterns(
+                database if database else self._metadata.database, refresh=refresh
             )
-            regex_formula2 = r"([-\w]+([-_]\d{13})|[-\w]+([-_]\d{4}([-_]\d{2}){1,2})|[-\w]+([-_]\d{4,8})|[-\w]+([-_]\d{1,3}))"
-            indices = {}
-            raw_indices = list(self.client.indices.get_alias(database if database else self._metadata.database).keys())
-            raw_indices.sort()
-            total_index = {}
-            for index in raw_indices:
-                clean_index = (
-                    f'{re.sub(regex_formula, "", index)}-*'
-                    if re.fullmatch(regex_formula2, index)
-                    else index
-                )
-                if "." in index or "{" in index:
-                    continue
-                else:
-                    total_index[clean_index] = (
-                        1
-                        if clean_index not in total_index
-                        else total_index[clean_index] + 1
+        except Exception:
+            raise
+
+    def bulk_index(
+        self,
+        actions: Iterable[dict],
+        index: str = None,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        thread_count: int = 1,
+        max_retries: int = 3,
+        initial_backoff: float = 2,
+        max_backoff: float = 60,
+        on_error: Callable[[dict], None] = None,
+        **kwargs,
+    ) -> dict:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            counter = {"total": 0, "failed": 0}
+
+            def counted(items: Iterable[dict]) -> Iterator[dict]:
+                for item in items:
+                    counter["total"] += 1
+                    yield item
+
+            def stream(items: Iterable[dict]) -> Iterator[dict]:
+                # Only failures are yielded, 429 rejections are retried with backoff
+                for _, info in helpers.streaming_bulk(
+                    self.client,
+                    items,
+                    chunk_size=chunk_size,
+                    max_chunk_bytes=max_chunk_bytes,
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                    max_retries=max_retries,
+                    initial_backoff=initial_backoff,
+                    max_backoff=max_backoff,
+                    yield_ok=False,
+                    index=index,
+                    **kwargs,
+                ):
+                    yield info
+
+            def report(errors: Iterable[dict]) -> None:
+                for error in errors:
+                    counter["failed"] += 1
+                    if on_error:
+                        on_error(error)
+
+            start = time.monotonic()
+            if thread_count <= 1:
+                report(stream(counted(actions)))
+            else:
+                with ThreadPoolExecutor(max_workers=thread_count) as executor:
+                    pending = set()
+                    for chunk in _chunked(counted(actions), chunk_size):
+                        pending.add(executor.submit(lambda c: list(stream(c)), chunk))
+                        if len(pending) >= thread_count * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                report(future.result())
+                    for future in pending:
+                        report(future.result())
+
+            elapsed = time.monotonic() - start
+            return {
+                "total": counter["total"],
+                "success": counter["total"] - counter["failed"],
+                "failed": counter["failed"],
+                "elapsed": elapsed,
+                "docsPerSecond": counter["total"] / elapsed if elapsed else 0.0,
+            }
+        except Exception:
+            raise
+
+    def iter_search(
+        self,
+        index: str,
+        query: dict = None,
+        source: list[str] | bool = None,
+        sort: list = None,
+        size: int = 1000,
+        mode: str = "pit",
+        keep_alive: str = "5m",
+        slices: int = 1,
+        batch: bool = False,
+        **kwargs,
+    ) -> Iterator[dict | list[dict]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+            if mode not in ("pit", "scroll"):
+                raise ValueError(f"Unknown search mode: {mode}")
+
+            body = {"query": query if query else {"match_all": {}}, "size": size}
+            if source is not None:
+                body["_source"] = source
+            pit_id = None
+            if mode == "pit":
+                pit_id = self.client.open_point_in_time(
+                    index=index, keep_alive=keep_alive
+                )["id"]
+                body["sort"] = sort if sort else ["_shard_doc"]
+                body["track_total_hits"] = False
+            else:
+                body["sort"] = sort if sort else ["_doc"]
+
+            try:
+                readers = [
+                    lambda slice_id=slice_id: self._search_slice(
+                        index, body, pit_id, keep_alive, slice_id, slices, **kwargs
                     )
-                    indices[clean_index] = {
-                        "indexName": index,
-                        "cleanIndexName": clean_index,
-                        "totalIndex": total_index[clean_index],
-                        "isIndexPattern": True
-                        if re.fullmatch(regex_formula2, index)
-                        else False,
-                    }
-            return list(indices.values())
+                    for slice_id in range(slices)
+                ]
+                batches = readers[0]() if slices <= 1 else merge_iterators(readers)
+                # Clear the scroll and stop slice threads before the PIT goes away,
+                # rather than whenever the abandoned generator gets collected
+                with closing(batches):
+                    for hits in batches:
+                        if batch:
+                            yield hits
+                        else:
+                            yield from hits
+            finally:
+                if pit_id:
+                    self.client.close_point_in_time(body={"id": pit_id}, ignore=404)
+
         except Exception:
             raise
-    
\ No newline at end of file
+
+    def _search_slice(
+        self,
+        index: str,
+        body: dict,
+        pit_id: str = None,
+        keep_alive: str = "5m",
+        slice_id: int = 0,
+        slices: int = 1,
+        **kwargs,
+    ) -> Iterator[list[dict]]:
+        body = dict(body)
+        if slices > 1:
+            body["slice"] = {"id": slice_id, "max": slices}
+
+        if pit_id:
+            while True:
+                body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                response = self.client.search(body=body, **kwargs)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if not hits:
+                    return
+                yield hits
+                body["search_after"] = hits[-1]["sort"]
+
+        scroll_id = None
+        try:
+            response = self.client.search(
+                index=index, body=body, scroll=keep_alive, **kwargs
+            )
+            while True:
+                scroll_id = response.get("_scroll_id")
+                hits = response["hits"]["hits"]
+                if not hits:
+                    return
+                yield hits
+                response = self.client.scroll(scroll_id=scroll_id, scroll=keep_alive)
+        finally:
+            if scroll_id:
+                self.client.clear_scroll(scroll_id=scroll_id, ignore=(404,))
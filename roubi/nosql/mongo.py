@@ -1,5 +1,27 @@
-from pymongo import MongoClient
+import asyncio
+import base64
+import functools
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator
+
+import bson
+from bson import json_util
+from pymongo import DeleteMany, DeleteOne, InsertOne, MongoClient, UpdateMany, UpdateOne
 from pymongo.collection import Collection
+from pymongo.cursor import Cursor
+from pymongo.errors import BulkWriteError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from typica import (
     BaseConnection,
@@ -11,10 +33,120 @@ from typica import (
     DataStatus,
 )
 
+from roubi.models.mongo import ExplainReport
+from roubi.utils import merge_iterators
+
+# BSON comparison order of the $type brackets a sort field can fall into
+_TYPE_ORDER = [
+    "null",
+    "number",
+    "string",
+    "object",
+    "binData",
+    "objectId",
+    "bool",
+    "date",
+    "timestamp",
+    "regex",
+]
+
+
+def _type_bracket(value: any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float, bson.Decimal128)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, (bytes, bson.Binary)):
+        return "binData"
+    if isinstance(value, bson.ObjectId):
+        return "objectId"
+    if isinstance(value, datetime):
+        return "date"
+    if isinstance(value, bson.Timestamp):
+        return "timestamp"
+    if isinstance(value, (bson.Regex, re.Pattern)):
+        return "regex"
+    raise ValueError(f"Unsupported keyset value type: {type(value).__name__}")
+
+
+class MongoCountCache:
+    def __init__(self, ttl: float = 30, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[tuple[str, str], tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: dict) -> str:
+        if "$and" in query and isinstance(query["$and"], list):
+            query = {
+                **query,
+                "$and": sorted(
+                    json_util.dumps(clause, sort_keys=True) for clause in query["$and"]
+                ),
+            }
+        return json_util.dumps(query, sort_keys=True)
+
+    def get(self, namespace: str, query: dict) -> int | None:
+        key = (namespace, self.normalize(query))
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, namespace: str, query: dict, value: int) -> None:
+        key = (namespace, self.normalize(query))
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace: str = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+                return
+            for key in [key for key in self._data if key[0] == namespace]:
+                del self._data[key]
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "hitRatio": self.hits / total if total else 0.0,
+        }
+
 
 class MongoRepository(BaseConnection):
-    def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
+    def __init__(
+        self,
+        metadata: ConnectionMeta | ConnectionUriMeta,
+        count_cache: MongoCountCache = None,
+        **kwargs,
+    ) -> None:
         super().__init__(metadata)
+        self.count_cache = count_cache
 
         if isinstance(self._metadata, ConnectionUriMeta) and self._metadata.uri:
             _client_host = self._metadata.uri
@@ -119,6 +251,39 @@ class MongoRepository(BaseConnection):
         except Exception:
             raise
 
+    def iter_find(
+        self,
+        collection: str,
+        query: dict = {},
+        filter: dict = None,
+        sort: list[tuple[str, int]] = None,
+        hint: str | list = None,
+        batch_size: int = 1000,
+        max_time_ms: int = None,
+        chunk_size: int = None,
+        database: str = None,
+        **kwargs,
+    ) -> Iterator[dict | list[dict]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            col: Collection = self.client[
+                database if database else self._metadata.database
+            ][collection]
+            cursor = col.find(query, filter, batch_size=batch_size, **kwargs)
+            if sort:
+                cursor = cursor.sort(sort)
+            if hint:
+                cursor = cursor.hint(hint)
+            if max_time_ms:
+                cursor = cursor.max_time_ms(max_time_ms)
+            with cursor:
+                yield from self._iter_cursor(cursor, chunk_size)
+
+        except Exception:
+            raise
+
     def find_paginate(
         self,
         collection: str,
@@ -127,6 +292,7 @@ class MongoRepository(BaseConnection):
         filter: dict = None,
         include_archive: bool = False,
         database: str = None,
+        match_mode: str = "regex",
     ) -> list[list, Pagination]:
         try:
             if not self.client:
@@ -135,60 +301,17 @@ class MongoRepository(BaseConnection):
             col: Collection = self.client[
                 database if database else self._metadata.database
             ][collection]
-            query = {"$and": []}
-            if parameter.filters:
-                for filter_param in parameter.filters:
-                    if filter_param.field and filter_param.value:
-                        if isinstance(filter_param.value, str):
-                            query["$and"].append(
-                                {
-                                    filter_param.field: {
-                                        "$regex": filter_param.value,
-                                        "$options": "i",
-                                    }
-                                }
-                            )
-                        else:
-                            query["$and"].append(
-                                {filter_param.field: filter_param.value}
-                            )
-            if additional_query:
-                query["$and"].append(additional_query)
-            if not include_archive:
-                query["$and"].append({"status": {"$ne": DataStatus.archive.value}})
-
-            if parameter.timeframe and parameter.timeframe.gte:
-                query["$and"].append(
-                    {
-                        parameter.timeframe.field: {
-                            "$gte": parameter.timeframe.gte,
-                            "$lte": parameter.timeframe.lte,
-                        }
-                    }
-                )
-            if not query["$and"]:
-                del query["$and"]
-            len_data = col.count_documents(query)
+            query = self._build_paginate_query(
+                parameter, additional_query, include_archive, match_mode
+            )
+            len_data = self._count_documents(col, query)
             if len_data == 0:
                 return [], Pagination(
                     size=parameter.size, totalPages=0, totalItems=len_data
                 )
 
-            result = col.find(query, filter)
-            if parameter.orderBy:
-                result = result.sort(
-                    parameter.orderBy, 1 if parameter.order == "ASC" else -1
-                )
-
-            total_pages = (
-                int(len_data / parameter.size) if len_data > parameter.size else 1
-            )
-            if parameter.page:
-                result = result.skip((parameter.page - 1) * parameter.size).limit(
-                    parameter.size * parameter.page
-                )
-            else:
-                result = result.limit(parameter.size)
+            result = self._paginate_cursor(col, query, parameter, filter)
+            total_pages = self._total_pages(len_data, parameter.size)
             return [
                 list(result) if result else None,
                 Pagination(
@@ -199,6 +322,335 @@ class MongoRepository(BaseConnection):
         except Exception:
             raise
 
+    @staticmethod
+    def _paginate_cursor(
+        col: Collection,
+        query: dict,
+        parameter: MultiFilterSchemas,
+        filter: dict = None,
+    ) -> Cursor:
+        result = col.find(query, filter)
+        if parameter.orderBy:
+            result = result.sort(
+                parameter.orderBy, 1 if parameter.order == "ASC" else -1
+            )
+        if parameter.page:
+            result = result.skip((parameter.page - 1) * parameter.size).limit(
+                parameter.size
+            )
+        else:
+            result = result.limit(parameter.size)
+        return result
+
+    @staticmethod
+    def _total_pages(len_data: int, size: int) -> int:
+        return int(len_data / size) if len_data > size else 1
+
+    def find_paginate_keyset(
+        self,
+        collection: str,
+        parameter: MultiFilterSchemas,
+        token: str = None,
+        additional_query: dict = {},
+        filter: dict = None,
+        include_archive: bool = False,
+        total: str | Callable[[Collection, dict], int] = None,
+        database: str = None,
+        match_mode: str = "regex",
+    ) -> list[list, Pagination | None, str | None]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            col: Collection = self.client[
+                database if database else self._metadata.database
+            ][collection]
+            query = self._build_paginate_query(
+                parameter, additional_query, include_archive, match_mode
+            )
+            len_data = self._paginate_total(col, query, total)
+
+            order_by = parameter.orderBy if parameter.orderBy else "_id"
+            direction = 1 if parameter.order == "ASC" else -1
+            sort = [(order_by, direction)]
+            if order_by != "_id":
+                sort.append(("_id", direction))
+            if filter:
+                filter = {
+                    key: value
+                    for key, value in filter.items()
+                    if key not in (order_by, "_id")
+                }
+                if any(filter.values()):
+                    filter.update({order_by: 1, "_id": 1})
+                filter = filter or None
+
+            page_query = query
+            if token:
+                page_query = {
+                    "$and": [
+                        query,
+                        self._keyset_query(order_by, direction, token),
+                    ]
+                }
+
+            result = list(
+                col.find(page_query, filter).sort(sort).limit(parameter.size + 1)
+            )
+            next_token = None
+            if len(result) > parameter.size:
+                result = result[: parameter.size]
+                next_token = self._encode_keyset_token(order_by, result[-1])
+
+            pagination = None
+            if len_data is not None:
+                pagination = Pagination(
+                    size=parameter.size,
+                    totalPages=math.ceil(len_data / parameter.size),
+                    totalItems=len_data,
+                )
+            return [result, pagination, next_token]
+
+        except Exception:
+            raise
+
+    def _count_documents(self, col: Collection, query: dict) -> int:
+        if self.count_cache is None:
+            return col.count_documents(query)
+
+        result = self.count_cache.get(col.full_name, query)
+        if result is None:
+            result = col.count_documents(query)
+            self.count_cache.set(col.full_name, query, result)
+        return result
+
+    def _invalidate_count(self, col: Collection) -> None:
+        if self.count_cache is not None:
+            self.count_cache.invalidate(col.full_name)
+
+    def _paginate_total(
+        self,
+        col: Collection,
+        query: dict,
+        total: str | Callable[[Collection, dict], int] = None,
+    ) -> int | None:
+        if not total:
+            return None
+        if callable(total):
+            return total(col, query)
+        if total == "exact":
+            return self._count_documents(col, query)
+        if total == "estimated":
+            return col.estimated_document_count()
+        raise ValueError(f"Unknown total mode: {total}")
+
+    @staticmethod
+    def _get_path(document: dict, path: str) -> any:
+        value = document
+        for part in path.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    @staticmethod
+    def _encode_keyset_token(order_by: str, document: dict) -> str:
+        value = MongoRepository._get_path(document, order_by)
+        raw = json_util.dumps({"v": value, "id": document["_id"]})
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _keyset_query(order_by: str, direction: int, token: str) -> dict:
+        try:
+            raw = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+        except Exception:
+            raise ValueError("Invalid pagination token")
+
+        op = "$gt" if direction == 1 else "$lt"
+        if order_by == "_id":
+            return {"_id": {op: raw["id"]}}
+
+        value = raw["v"]
+        branches = [{order_by: value, "_id": {op: raw["id"]}}]
+        if value is not None:
+            branches.append({order_by: {op: value}})
+        # Range operators stay inside one BSON type, values of the types that
+        # sort after (ASC) or before (DESC) the token need their own branch
+        position = _TYPE_ORDER.index(_type_bracket(value))
+        if direction == 1:
+            types = _TYPE_ORDER[position + 1 :]
+        else:
+            types = _TYPE_ORDER[1:position]
+            if value is not None:
+                # Matches missing fields too, which sort together with null
+                branches.append({order_by: None})
+        if types:
+            branches.append({order_by: {"$type": types}})
+        return {"$or": branches}
+
+    @staticmethod
+    def _build_paginate_query(
+        parameter: MultiFilterSchemas,
+        additional_query: dict = {},
+        include_archive: bool = False,
+        match_mode: str = "regex",
+    ) -> dict:
+        query = {"$and": []}
+        if parameter.filters:
+            for filter_param in parameter.filters:
+                if filter_param.field and filter_param.value:
+                    if isinstance(filter_param.value, str):
+                        query["$and"].append(
+                            {
+                                filter_param.field: MongoRepository._match_filter(
+                                    filter_param.value, match_mode
+                                )
+                            }
+                        )
+                    else:
+                        query["$and"].append(
+                            {filter_param.field: filter_param.value}
+                        )
+        if additional_query:
+            query["$and"].append(additional_query)
+        if not include_archive:
+            query["$and"].append({"status": {"$ne": DataStatus.archive.value}})
+
+        if parameter.timeframe and parameter.timeframe.gte:
+            query["$and"].append(
+                {
+                    parameter.timeframe.field: {
+                        "$gte": parameter.timeframe.gte,
+                        "$lte": parameter.timeframe.lte,
+                    }
+                }
+            )
+        if not query["$and"]:
+            del query["$and"]
+        return query
+
+    @staticmethod
+    def _match_filter(value: str, match_mode: str = "regex") -> dict | str:
+        if match_mode == "regex":
+            return {"$regex": value, "$options": "i"}
+        if match_mode == "prefix":
+            return {"$regex": f"^{re.escape(value)}"}
+        if match_mode == "exact":
+            return value
+        raise ValueError(f"Unknown match mode: {match_mode}")
+
+    def explain_paginate(
+        self,
+        collection: str,
+        parameter: MultiFilterSchemas,
+        additional_query: dict = {},
+        include_archive: bool = False,
+        database: str = None,
+        match_mode: str = "regex",
+    ) -> ExplainReport:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            col: Collection = self.client[
+                database if database else self._metadata.database
+            ][collection]
+            query = self._build_paginate_query(
+                parameter, additional_query, include_archive, match_mode
+            )
+            command = {"find": col.name, "filter": query, "limit": parameter.size}
+            if parameter.orderBy:
+                command["sort"] = {
+                    parameter.orderBy: 1 if parameter.order == "ASC" else -1
+                }
+            if parameter.page:
+                command["skip"] = (parameter.page - 1) * parameter.size
+            explain = col.database.command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+
+            winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+            plan_stages = self._plan_stages(winning_plan)
+            stats = explain.get("executionStats", {})
+            suggested_index, unindexable = self._suggest_index(
+                parameter, additional_query, include_archive, match_mode
+            )
+            return ExplainReport(
+                stages=[stage["stage"] for stage in plan_stages],
+                indexesUsed=list(
+                    dict.fromkeys(
+                        stage["indexName"]
+                        for stage in plan_stages
+                        if stage.get("indexName")
+                    )
+                ),
+                isCollscan=any(stage["stage"] == "COLLSCAN" for stage in plan_stages),
+                nReturned=stats.get("nReturned", 0),
+                docsExamined=stats.get("totalDocsExamined", 0),
+                keysExamined=stats.get("totalKeysExamined", 0),
+                executionTimeMillis=stats.get("executionTimeMillis", 0),
+                suggestedIndex=suggested_index,
+                unindexableFilters=unindexable,
+                winningPlan=winning_plan,
+            )
+
+        except Exception:
+            raise
+
+    @staticmethod
+    def _plan_stages(plan: dict | list) -> list[dict]:
+        stages = []
+        if isinstance(plan, list):
+            for item in plan:
+                stages.extend(MongoRepository._plan_stages(item))
+        elif isinstance(plan, dict):
+            if "stage" in plan:
+                stages.append(plan)
+            for value in plan.values():
+                if isinstance(value, (dict, list)):
+                    stages.extend(MongoRepository._plan_stages(value))
+        return stages
+
+    @staticmethod
+    def _suggest_index(
+        parameter: MultiFilterSchemas,
+        additional_query: dict = {},
+        include_archive: bool = False,
+        match_mode: str = "regex",
+    ) -> tuple[list[tuple[str, int]], list[str]]:
+        # Equality, sort, range ordering for compound index keys
+        equality, ranges, unindexable = [], [], []
+        for filter_param in parameter.filters or []:
+            if not (filter_param.field and filter_param.value):
+                continue
+            if not isinstance(filter_param.value, str) or match_mode == "exact":
+                equality.append(filter_param.field)
+            elif match_mode == "prefix":
+                ranges.append(filter_param.field)
+            else:
+                unindexable.append(filter_param.field)
+        for field, value in (additional_query or {}).items():
+            if field.startswith("$"):
+                continue
+            if isinstance(value, dict) and any(key.startswith("$") for key in value):
+                ranges.append(field)
+            else:
+                equality.append(field)
+        if not include_archive:
+            ranges.append("status")
+        if parameter.timeframe and parameter.timeframe.gte:
+            ranges.append(parameter.timeframe.field)
+
+        keys = [(field, 1) for field in equality]
+        if parameter.orderBy:
+            keys.append((parameter.orderBy, 1 if parameter.order == "ASC" else -1))
+        keys.extend((field, 1) for field in ranges)
+
+        suggested, seen = [], set()
+        for field, direction in keys:
+            if field not in seen:
+                seen.add(field)
+                suggested.append((field, direction))
+        return suggested, unindexable
+
     def insert_one(
         self,
         collection: str,
@@ -225,12 +677,21 @@ class MongoRepository(BaseConnection):
                     )
 
             result = col.insert_one(data, **kwargs)
+            self._invalidate_count(col)
             return DataValidResponse(status=True, data=result)
 
         except Exception:
             raise
 
-    def insert_many(self, collection: str, data: list, database: str = None, **kwargs):
+    def insert_many(
+        self,
+        collection: str,
+        data: list,
+        database: str = None,
+        unique_keys: list = [],
+        unique_chunk_size: int = 1000,
+        **kwargs,
+    ):
         try:
             if not self.client:
                 raise ValueError("Fail connect")
@@ -238,12 +699,78 @@ class MongoRepository(BaseConnection):
             col: Collection = self.client[
                 database if database else self._metadata.database
             ][collection]
-            result = col.insert_many(data, **kwargs)
-            return result
+            if not unique_keys:
+                result = col.insert_many(data, **kwargs)
+                self._invalidate_count(col)
+                return result
+
+            existing = self._existing_unique_values(
+                col, data, unique_keys, unique_chunk_size
+            )
+            responses: list[DataValidResponse | None] = [None] * len(data)
+            valid_index = []
+            for index, document in enumerate(data):
+                duplicates = []
+                for key in unique_keys:
+                    if key not in document:
+                        continue
+                    value = self._unique_value(document[key])
+                    if value in existing[key]:
+                        duplicates.append(key)
+                if duplicates:
+                    responses[index] = DataValidResponse(
+                        status=False, detail="unique validation", data=duplicates
+                    )
+                    continue
+                for key in unique_keys:
+                    if key in document:
+                        existing[key].add(self._unique_value(document[key]))
+                valid_index.append(index)
+
+            if valid_index:
+                result = col.insert_many([data[index] for index in valid_index], **kwargs)
+                self._invalidate_count(col)
+                for index, inserted_id in zip(valid_index, result.inserted_ids):
+                    responses[index] = DataValidResponse(status=True, data=inserted_id)
+            return responses
 
         except Exception:
             raise
 
+    @staticmethod
+    def _unique_value(value: any) -> any:
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return json_util.dumps(value, sort_keys=True)
+
+    def _existing_unique_values(
+        self,
+        col: Collection,
+        data: list[dict],
+        unique_keys: list,
+        chunk_size: int = 1000,
+    ) -> dict[str, set]:
+        existing = {key: set() for key in unique_keys}
+        for key in unique_keys:
+            values = list(
+                {
+                    self._unique_value(document[key]): document[key]
+                    for document in data
+                    if key in document
+                }.values()
+            )
+            for start in range(0, len(values), chunk_size):
+                cursor = col.find(
+                    {key: {"$in": values[start : start + chunk_size]}},
+                    {"_id": 0, key: 1},
+                )
+                for document in cursor:
+                    value = self._get_path(document, key)
+                    existing[key].add(self._unique_value(value))
+        return existing
+
     def update_one(
         self, collection: str, query: dict, data: dict, database: str = None, **kwargs
     ):
@@ -255,6 +782,7 @@ class MongoRepository(BaseConnection):
                 database if database else self._metadata.database
             ][collection]
             result = col.update_one(query, data, **kwargs)
+            self._invalidate_count(col)
             return result
 
         except Exception:
@@ -271,6 +799,7 @@ class MongoRepository(BaseConnection):
                 database if database else self._metadata.database
             ][collection]
             result = col.update_many(query, data, **kwargs)
+            self._invalidate_count(col)
             return result
 
         except Exception:
@@ -287,6 +816,7 @@ class MongoRepository(BaseConnection):
             result = col.update_one(
                 query, {"$set": {"status": DataStatus.archive}}, **kwargs
             )
+            self._invalidate_count(col)
             return result
 
         except Exception:
@@ -305,6 +835,7 @@ class MongoRepository(BaseConnection):
             result = col.update_many(
                 query, {"$set": {"status": DataStatus.archive}}, **kwargs
             )
+            self._invalidate_count(col)
             return result
 
         except Exception:
@@ -319,6 +850,7 @@ class MongoRepository(BaseConnection):
                 database if database else self._metadata.database
             ][collection]
             result = col.delete_one(query, **kwargs)
+            self._invalidate_count(col)
             return result
 
         except Exception:
@@ -333,11 +865,298 @@ class MongoRepository(BaseConnection):
                 database if database else self._metadata.database
             ][collection]
             result = col.delete_many(query, **kwargs)
+            self._invalidate_count(col)
             return result
 
         except Exception:
             raise
 
+    def partition_ranges(
+        self,
+        collection: str,
+        partitions: int,
+        field: str = "_id",
+        query: dict = {},
+        method: str = "sample",
+        samples_per_partition: int = 20,
+        database: str = None,
+    ) -> list[tuple[any, any]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            col: Collection = self.client[
+                database if database else self._metadata.database
+            ][collection]
+            if partitions <= 1:
+                return [(None, None)]
+
+            if method == "bucket":
+                pipeline = [
+                    {"$match": query},
+                    {"$bucketAuto": {"groupBy": f"${field}", "buckets": partitions}},
+                ]
+                bounds = [bucket["_id"]["min"] for bucket in col.aggregate(pipeline)][1:]
+                # $bucketAuto walks BSON order, so bounds keep their order here
+                bounds = self._dominant_type(bounds)
+            elif method == "sample":
+                pipeline = [
+                    {"$match": query},
+                    {"$sample": {"size": partitions * samples_per_partition}},
+                    {"$project": {field: 1}},
+                ]
+                values = {}
+                for document in col.aggregate(pipeline):
+                    value = self._get_path(document, field)
+                    if value is not None:
+                        values[self._unique_value(value)] = value
+                values = sorted(self._dominant_type(list(values.values())))
+                step = len(values) / partitions
+                bounds = (
+                    list(
+                        dict.fromkeys(
+                            values[int(step * index)] for index in range(1, partitions)
+                        )
+                    )
+                    if values
+                    else []
+                )
+            else:
+                raise ValueError(f"Unknown partition method: {method}")
+
+            lowers = [None, *bounds]
+            uppers = [*bounds, None]
+            return list(zip(lowers, uppers))
+
+        except Exception:
+            raise
+
+    def parallel_find(
+        self,
+        collection: str,
+        query: dict = {},
+        filter: dict = None,
+        field: str = "_id",
+        workers: int = 4,
+        partitions: int = None,
+        batch_size: int = 1000,
+        chunk_size: int = None,
+        merge: bool = True,
+        method: str = "sample",
+        database: str = None,
+    ) -> Iterator[dict | list[dict]] | list[Iterator[dict | list[dict]]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            ranges = self.partition_ranges(
+                collection,
+                partitions if partitions else workers,
+                field=field,
+                query=query,
+                method=method,
+                database=database,
+            )
+            queries = [
+                self._range_query(query, field, lower, upper) for lower, upper in ranges
+            ]
+            if len(ranges) > 1:
+                # Range operators only match values in the bounds' type bracket, so
+                # null, missing and differently typed values get their own partition
+                queries.append(self._outside_range_query(query, field, ranges[0][1]))
+            readers = [
+                lambda range_query=range_query: self.iter_find(
+                    collection,
+                    range_query,
+                    filter,
+                    sort=[(field, 1)],
+                    batch_size=batch_size,
+                    chunk_size=batch_size,
+                    database=database,
+                )
+                for range_query in queries
+            ]
+            if merge:
+                return self._merged_scan(readers, workers, chunk_size)
+
+            semaphore = threading.BoundedSemaphore(workers)
+            return [
+                self._partition_scan(reader, semaphore, chunk_size) for reader in readers
+            ]
+
+        except Exception:
+            raise
+
+    @staticmethod
+    def _range_query(query: dict, field: str, lower: any, upper: any) -> dict:
+        bound = {}
+        if lower is not None:
+            bound["$gte"] = lower
+        if upper is not None:
+            bound["$lt"] = upper
+        if not bound:
+            return query
+        if not query:
+            return {field: bound}
+        return {"$and": [query, {field: bound}]}
+
+    @staticmethod
+    def _dominant_type(values: list) -> list:
+        # Range bounds must share one BSON type bracket, values of other types
+        # are read by the catch-all partition in parallel_find
+        brackets = {}
+        for value in values:
+            if value is None:
+                continue
+            try:
+                bracket = _type_bracket(value)
+            except ValueError:
+                bracket = type(value).__name__
+            brackets.setdefault(bracket, []).append(value)
+        return max(brackets.values(), key=len) if brackets else []
+
+    @staticmethod
+    def _outside_range_query(query: dict, field: str, bound: any) -> dict:
+        outside = {"$nor": [{field: {"$lt": bound}}, {field: {"$gte": bound}}]}
+        if not query:
+            return outside
+        return {"$and": [query, outside]}
+
+    @staticmethod
+    def _rechunk(
+        chunks: Iterator[list[dict]], chunk_size: int = None
+    ) -> Iterator[dict | list[dict]]:
+        for chunk in chunks:
+            if chunk_size:
+                for start in range(0, len(chunk), chunk_size):
+                    yield chunk[start : start + chunk_size]
+            else:
+                yield from chunk
+
+    def _merged_scan(
+        self,
+        readers: list[Callable[[], Iterator[list[dict]]]],
+        workers: int,
+        chunk_size: int = None,
+    ) -> Iterator[dict | list[dict]]:
+        with closing(merge_iterators(readers, workers)) as chunks:
+            yield from self._rechunk(chunks, chunk_size)
+
+    def _partition_scan(
+        self,
+        reader: Callable[[], Iterator[list[dict]]],
+        semaphore: threading.BoundedSemaphore,
+        chunk_size: int = None,
+    ) -> Iterator[dict | list[dict]]:
+        # The reader only starts once the consumer begins iterating, and holds one
+        # of the worker slots until the scan is exhausted or closed
+        with semaphore:
+            with closing(merge_iterators([reader], buffer_size=2)) as chunks:
+                yield from self._rechunk(chunks, chunk_size)
+
+    def find_columns(
+        self,
+        collection: str,
+        query: dict = {},
+        fields: list[str] = None,
+        sort: list[tuple[str, int]] = None,
+        hint: str | list = None,
+        batch_size: int = 10000,
+        max_time_ms: int = None,
+        database: str = None,
+        **kwargs,
+    ) -> Iterator[dict[str, "np.ma.MaskedArray"]]:
+        try:
+            if np is None:
+                raise ImportError("find_columns requires numpy to be installed")
+
+            projection = None
+            if fields:
+                projection = {field: 1 for field in fields}
+                if "_id" not in fields:
+                    projection["_id"] = 0
+            chunks = self.iter_find(
+                collection,
+                query,
+                projection,
+                sort=sort,
+                hint=hint,
+                batch_size=batch_size,
+                max_time_ms=max_time_ms,
+                chunk_size=batch_size,
+                database=database,
+                **kwargs,
+            )
+            yield from self._iter_columns(chunks, fields)
+
+        except Exception:
+            raise
+
+    def aggregate_columns(
+        self,
+        collection: str,
+        agg_query: list,
+        fields: list[str] = None,
+        batch_size: int = 10000,
+        max_time_ms: int = None,
+        database: str = None,
+        **kwargs,
+    ) -> Iterator[dict[str, "np.ma.MaskedArray"]]:
+        try:
+            if np is None:
+                raise ImportError("aggregate_columns requires numpy to be installed")
+
+            chunks = self.iter_aggregate(
+                collection,
+                agg_query,
+                batch_size=batch_size,
+                max_time_ms=max_time_ms,
+                chunk_size=batch_size,
+                database=database,
+                **kwargs,
+            )
+            yield from self._iter_columns(chunks, fields)
+
+        except Exception:
+            raise
+
+    def _iter_columns(
+        self, chunks: Iterator[list[dict]], fields: list[str] = None
+    ) -> Iterator[dict[str, "np.ma.MaskedArray"]]:
+        with closing(chunks):
+            for chunk in chunks:
+                if not fields:
+                    fields = list(dict.fromkeys(key for document in chunk for key in document))
+                yield {
+                    field: self._column_array(
+                        [self._get_path(document, field) for document in chunk]
+                    )
+                    for field in fields
+                }
+
+    @staticmethod
+    def _column_array(values: list) -> "np.ma.MaskedArray":
+        mask = np.fromiter((value is None for value in values), bool, len(values))
+        types = {type(value) for value in values if value is not None}
+        if types and types <= {bool}:
+            dtype, fill = bool, False
+        elif types and types <= {int}:
+            dtype, fill = np.int64, 0
+        elif types and types <= {int, float}:
+            dtype, fill = np.float64, np.nan
+        elif types and types <= {datetime}:
+            dtype, fill = "datetime64[us]", None
+        else:
+            dtype, fill = object, None
+
+        try:
+            data = np.array(
+                [fill if value is None else value for value in values], dtype=dtype
+            )
+        except (OverflowError, TypeError, ValueError):
+            data = np.array(values, dtype=object)
+        return np.ma.MaskedArray(data, mask=mask)
+
     def aggregate(
         self, collection: str, agg_query: list, database: str = None, **kwargs
     ):
@@ -354,3 +1173,451 @@ class MongoRepository(BaseConnection):
 
         except Exception:
             raise
+
+    def iter_aggregate(
+        self,
+        collection: str,
+        agg_query: list,
+        filter: dict = None,
+        sort: list[tuple[str, int]] = None,
+        hint: str | list = None,
+        batch_size: int = 1000,
+        max_time_ms: int = None,
+        chunk_size: int = None,
+        database: str = None,
+        **kwargs,
+    ) -> Iterator[dict | list[dict]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            col: Collection = self.client[
+                database if database else self._metadata.database
+            ][collection]
+            pipeline = list(agg_query)
+            if sort:
+                pipeline.append({"$sort": dict(sort)})
+            if filter:
+                pipeline.append({"$project": filter})
+            if hint:
+                kwargs["hint"] = hint
+            if max_time_ms:
+                kwargs["maxTimeMS"] = max_time_ms
+            cursor = col.aggregate(pipeline, batchSize=batch_size, **kwargs)
+            with cursor:
+                yield from self._iter_cursor(cursor, chunk_size)
+
+        except Exception:
+            raise
+
+    @staticmethod
+    def _iter_cursor(cursor, chunk_size: int = None) -> Iterator[dict | list[dict]]:
+        if not chunk_size:
+            yield from cursor
+            return
+
+        chunk = []
+        for document in cursor:
+            chunk.append(document)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class MongoBulkWriter:
+    def __init__(
+        self,
+        repository: MongoRepository,
+        collection: str,
+        database: str = None,
+        max_docs: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+        flush_interval: float = None,
+        background: bool = False,
+        on_error: Callable[[list[dict]], None] = None,
+    ) -> None:
+        self.repository = repository
+        self.col: Collection = repository.get_collection(collection, database)
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.errors: list[dict] = []
+        self.stats = {
+            "flushes": 0,
+            "inserted": 0,
+            "matched": 0,
+            "modified": 0,
+            "upserted": 0,
+            "deleted": 0,
+            "failed": 0,
+        }
+        self._ops: list = []
+        self._bytes = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._exception: Exception | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if background and flush_interval:
+            self._thread = threading.Thread(
+                target=self._run, name=f"bulk-writer-{collection}", daemon=True
+            )
+            self._thread.start()
+
+    def __enter__(self) -> "MongoBulkWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def insert(self, data: dict) -> None:
+        self._add(InsertOne(data), data)
+
+    def update(
+        self, query: dict, data: dict | list, upsert: bool = False, many: bool = False
+    ) -> None:
+        operation = UpdateMany if many else UpdateOne
+        self._add(operation(query, data, upsert=upsert), query, data)
+
+    def upsert(self, query: dict, data: dict | list) -> None:
+        self.update(query, data, upsert=True)
+
+    def delete(self, query: dict, many: bool = False) -> None:
+        operation = DeleteMany if many else DeleteOne
+        self._add(operation(query), query)
+
+    def _add(self, operation, *documents: dict | list) -> None:
+        if self._closed:
+            raise ValueError("Bulk writer is closed")
+        self._raise_background_error()
+
+        # Wrapped so pipeline-style updates (a list of stages) can be sized too
+        size = len(bson.encode({"d": list(documents)}))
+        with self._lock:
+            self._ops.append(operation)
+            self._bytes += size
+            should_flush = len(self._ops) >= self.max_docs or self._bytes >= self.max_bytes
+        if not should_flush and self.flush_interval and not self._thread:
+            should_flush = time.monotonic() - self._last_flush >= self.flush_interval
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                operations, self._ops = self._ops, []
+                size, self._bytes = self._bytes, 0
+            self._last_flush = time.monotonic()
+            if not operations:
+                return None
+
+            try:
+                result = self.col.bulk_write(operations, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                result = None
+                details = e.details
+            except Exception:
+                # Requeue the batch so a later flush can retry it instead of losing it
+                with self._lock:
+                    self._ops = operations + self._ops
+                    self._bytes += size
+                raise
+            finally:
+                self.repository._invalidate_count(self.col)
+
+            self.stats["flushes"] += 1
+            self.stats["inserted"] += details.get("nInserted", 0)
+            self.stats["matched"] += details.get("nMatched", 0)
+            self.stats["modified"] += details.get("nModified", 0)
+            self.stats["upserted"] += details.get("nUpserted", 0)
+            self.stats["deleted"] += details.get("nRemoved", 0)
+
+            write_errors = details.get("writeErrors", [])
+            if write_errors:
+                self.stats["failed"] += len(write_errors)
+                self.errors.extend(write_errors)
+                if self.on_error:
+                    self.on_error(write_errors)
+            return result
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        self._raise_background_error()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                continue
+            try:
+                self.flush()
+            except Exception as e:
+                self._exception = e
+                return
+
+    def _raise_background_error(self) -> None:
+        if self._exception is not None:
+            exception, self._exception = self._exception, None
+            raise exception
+
+
+class AsyncMongoRepository(BaseConnection):
+    def __init__(
+        self,
+        metadata: ConnectionMeta | ConnectionUriMeta,
+        max_concurrency: int = 16,
+        count_cache: MongoCountCache = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(metadata)
+        self.repository = MongoRepository(metadata, count_cache=count_cache, **kwargs)
+        self.client = self.repository.client
+        self.db = self.repository.db
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="async-mongo"
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run(self, func: Callable, *args, **kwargs) -> any:
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def close(self):
+        await self._run(self.repository.close)
+        self._executor.shutdown(wait=False)
+
+    async def gather(self, *coroutines, limit: int = None) -> list:
+        if not limit:
+            return await asyncio.gather(*coroutines)
+
+        semaphore = asyncio.Semaphore(limit)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(bounded(coroutine) for coroutine in coroutines))
+
+    async def count(self, collection: str, query: dict = {}, database: str = None) -> any:
+        return await self._run(self.repository.count, collection, query, database)
+
+    async def find_one(
+        self,
+        collection: str,
+        query: dict = {},
+        filter: dict = None,
+        database: str = None,
+    ) -> any:
+        return await self._run(
+            self.repository.find_one, collection, query, filter, database
+        )
+
+    async def find(
+        self,
+        collection: str,
+        query: dict = {},
+        filter: dict = None,
+        database: str = None,
+    ) -> any:
+        return await self._run(self.repository.find, collection, query, filter, database)
+
+    async def find_paginate(
+        self,
+        collection: str,
+        parameter: MultiFilterSchemas,
+        additional_query: dict = {},
+        filter: dict = None,
+        include_archive: bool = False,
+        database: str = None,
+        match_mode: str = "regex",
+    ) -> list[list, Pagination]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            col: Collection = self.repository.get_collection(collection, database)
+            query = MongoRepository._build_paginate_query(
+                parameter, additional_query, include_archive, match_mode
+            )
+            len_data, result = await asyncio.gather(
+                self._run(self.repository._count_documents, col, query),
+                self._run(
+                    lambda: list(
+                        MongoRepository._paginate_cursor(col, query, parameter, filter)
+                    )
+                ),
+            )
+            if len_data == 0:
+                return [], Pagination(
+                    size=parameter.size, totalPages=0, totalItems=len_data
+                )
+
+            total_pages = MongoRepository._total_pages(len_data, parameter.size)
+            return [
+                result,
+                Pagination(
+                    size=parameter.size, totalPages=total_pages, totalItems=len_data
+                ),
+            ]
+
+        except Exception:
+            raise
+
+    async def iter_find(
+        self,
+        collection: str,
+        query: dict = {},
+        filter: dict = None,
+        batch_size: int = 1000,
+        chunk_size: int = None,
+        database: str = None,
+        **kwargs,
+    ) -> AsyncIterator[dict | list[dict]]:
+        generator = self.repository.iter_find(
+            collection,
+            query,
+            filter,
+            batch_size=batch_size,
+            chunk_size=batch_size,
+            database=database,
+            **kwargs,
+        )
+        async for item in self._iter_chunks(generator, chunk_size):
+            yield item
+
+    async def iter_aggregate(
+        self,
+        collection: str,
+        agg_query: list,
+        batch_size: int = 1000,
+        chunk_size: int = None,
+        database: str = None,
+        **kwargs,
+    ) -> AsyncIterator[dict | list[dict]]:
+        generator = self.repository.iter_aggregate(
+            collection,
+            agg_query,
+            batch_size=batch_size,
+            chunk_size=batch_size,
+            database=database,
+            **kwargs,
+        )
+        async for item in self._iter_chunks(generator, chunk_size):
+            yield item
+
+    async def _iter_chunks(
+        self, generator: Iterator[list[dict]], chunk_size: int = None
+    ) -> AsyncIterator[dict | list[dict]]:
+        fetch = None
+        try:
+            while True:
+                # Shielded so a cancelled consumer leaves the fetch running to completion
+                fetch = asyncio.ensure_future(self._run(next, generator, None))
+                chunk = await asyncio.shield(fetch)
+                if chunk is None:
+                    return
+                if not chunk_size:
+                    for document in chunk:
+                        yield document
+                    continue
+                for start in range(0, len(chunk), chunk_size):
+                    yield chunk[start : start + chunk_size]
+        finally:
+            if fetch is not None and not fetch.done():
+                # Cancelled while next() still runs on a worker thread, closing the
+                # generator before it returns raises "generator already executing"
+                await asyncio.wait([fetch])
+                if not fetch.cancelled():
+                    fetch.exception()
+            try:
+                await self._run(generator.close)
+            except RuntimeError:
+                # Executor already shut down, close the cursor on this thread
+                generator.close()
+
+    async def insert_one(
+        self,
+        collection: str,
+        data: dict,
+        database: str = None,
+        unique_keys: list = [],
+        **kwargs,
+    ) -> DataValidResponse:
+        return await self._run(
+            self.repository.insert_one, collection, data, database, unique_keys, **kwargs
+        )
+
+    async def insert_many(
+        self,
+        collection: str,
+        data: list,
+        database: str = None,
+        unique_keys: list = [],
+        **kwargs,
+    ):
+        return await self._run(
+            self.repository.insert_many, collection, data, database, unique_keys, **kwargs
+        )
+
+    async def update_one(
+        self, collection: str, query: dict, data: dict, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.update_one, collection, query, data, database, **kwargs
+        )
+
+    async def update_many(
+        self, collection: str, query: dict, data: dict, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.update_many, collection, query, data, database, **kwargs
+        )
+
+    async def archive_one(
+        self, collection: str, query: dict, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.archive_one, collection, query, database, **kwargs
+        )
+
+    async def archive_many(
+        self, collection: str, query: dict, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.archive_many, collection, query, database, **kwargs
+        )
+
+    async def delete_one(
+        self, collection: str, query: dict, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.delete_one, collection, query, database, **kwargs
+        )
+
+    async def delete_many(
+        self, collection: str, query: dict, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.delete_many, collection, query, database, **kwargs
+        )
+
+    async def aggregate(
+        self, collection: str, agg_query: list, database: str = None, **kwargs
+    ):
+        return await self._run(
+            self.repository.aggregate, collection, agg_query, database, **kwargs
+        )
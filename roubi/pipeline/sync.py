@@ -0,0 +1,339 @@
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import closing
+from typing import Any, Callable
+
+from bson import json_util
+
+from roubi.nosql.elastic import ElasticRepository
+from roubi.nosql.mongo import MongoRepository
+from roubi.sql.clickhouse import CHRepository
+
+
+_STAGE_DONE = object()
+
+
+class FileCheckpoint:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self) -> Any:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as file:
+            return json_util.loads(file.read()).get("value")
+
+    def save(self, value: Any) -> None:
+        # Write then rename so a crash never leaves a truncated checkpoint
+        temp = f"{self.path}.tmp"
+        with open(temp, "w") as file:
+            file.write(json_util.dumps({"value": value, "savedAt": time.time()}))
+        os.replace(temp, self.path)
+
+
+class StageStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.rows = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.started: float | None = None
+        self.finished: float | None = None
+        self._lock = threading.Lock()
+
+    def record(self, rows: int, elapsed: float) -> None:
+        with self._lock:
+            if self.started is None:
+                self.started = time.monotonic() - elapsed
+            self.rows += rows
+            self.batches += 1
+            self.busy += elapsed
+
+    def to_dict(self) -> dict:
+        end = self.finished or time.monotonic()
+        wall = end - self.started if self.started is not None else 0.0
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "busy": self.busy,
+            "elapsed": wall,
+            "rowsPerSecond": self.rows / wall if wall else 0.0,
+        }
+
+
+class ElasticSink:
+    def __init__(
+        self,
+        repository: ElasticRepository,
+        index: str,
+        id_field: str = "_id",
+        **kwargs,
+    ) -> None:
+        self.repository = repository
+        self.index = index
+        self.id_field = id_field
+        self.kwargs = kwargs
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _action(self, document: dict) -> dict:
+        document = dict(document)
+        action = {"_index": self.index, "_source": document}
+        if self.id_field in document:
+            action["_id"] = str(document.pop(self.id_field))
+        return action
+
+    def write(self, batch: list[dict]) -> None:
+        result = self.repository.bulk_index(
+            (self._action(document) for document in batch),
+            index=self.index,
+            chunk_size=max(len(batch), 1),
+            **self.kwargs,
+        )
+        if result["failed"]:
+            with self._lock:
+                self.failed += result["failed"]
+            # Failing here keeps the checkpoint from moving past unindexed documents
+            raise ValueError(
+                f"{result['failed']} documents failed to index into {self.index}"
+            )
+
+    def close(self) -> None:
+        pass
+
+
+class ClickHouseSink:
+    def __init__(
+        self,
+        repository: CHRepository,
+        table: str,
+        column_names: list[str] = None,
+        async_insert: bool = False,
+        database: str = None,
+        settings: dict = None,
+    ) -> None:
+        self.repository = repository
+        self.table = table
+        self.column_names = column_names
+        self.async_insert = async_insert
+        self.database = database
+        self.settings = settings
+        self.stats = {"rows": 0, "blocks": 0, "elapsed": 0.0}
+        self._lock = threading.Lock()
+
+    def write(self, batch: list[dict]) -> None:
+        # Each pipeline batch is inserted as one block before returning, so the
+        # pipeline batch_size is the insert block size and the checkpoint never
+        # runs ahead of rows still sitting in a buffer
+        result = self.repository.insert_rows(
+            self.table,
+            batch,
+            column_names=self.column_names,
+            block_size=max(len(batch), 1),
+            async_insert=self.async_insert,
+            database=self.database,
+            settings=self.settings,
+        )
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] += result[key]
+
+    def close(self) -> None:
+        pass
+
+
+class MongoSyncPipeline:
+    def __init__(
+        self,
+        source: MongoRepository,
+        collection: str,
+        sink: ElasticSink | ClickHouseSink,
+        transform: Callable[[dict], dict | None] = None,
+        query: dict = {},
+        projection: dict = None,
+        checkpoint: FileCheckpoint = None,
+        checkpoint_field: str = "_id",
+        batch_size: int = 1000,
+        transform_workers: int = 1,
+        sink_workers: int = 1,
+        queue_size: int = 4,
+        database: str = None,
+    ) -> None:
+        self.source = source
+        self.collection = collection
+        self.sink = sink
+        self.transform = transform
+        self.query = query
+        self.projection = projection
+        self.checkpoint = checkpoint
+        self.checkpoint_field = checkpoint_field
+        self.batch_size = batch_size
+        self.transform_workers = transform_workers
+        self.sink_workers = sink_workers
+        self.queue_size = queue_size
+        self.database = database
+        self.stats = {name: StageStats(name) for name in ("source", "transform", "sink")}
+        self.last_value = None
+
+    def _source_projection(self) -> dict | None:
+        # The checkpoint is read from the last document, so it must be projected
+        if not self.projection:
+            return self.projection
+        projection = dict(self.projection)
+        if any(value for key, value in projection.items() if key != "_id"):
+            projection[self.checkpoint_field] = 1
+        else:
+            projection.pop(self.checkpoint_field, None)
+        return projection
+
+    def _source_query(self, last_value: Any) -> dict:
+        if last_value is None:
+            return self.query
+        # Timestamps are not unique, so resuming on them is inclusive and may
+        # re-send rows that share the last value
+        operator = "$gt" if self.checkpoint_field == "_id" else "$gte"
+        bound = {self.checkpoint_field: {operator: last_value}}
+        return {"$and": [self.query, bound]} if self.query else bound
+
+    def _read(self, output: queue.Queue, stop: threading.Event, offer) -> None:
+        last_value = self.checkpoint.load() if self.checkpoint else None
+        chunks = self.source.iter_find(
+            self.collection,
+            self._source_query(last_value),
+            self._source_projection(),
+            sort=[(self.checkpoint_field, 1)],
+            batch_size=self.batch_size,
+            chunk_size=self.batch_size,
+            database=self.database,
+        )
+        with closing(chunks):
+            sequence = 0
+            while not stop.is_set():
+                start = time.monotonic()
+                batch = next(chunks, None)
+                if batch is None:
+                    return
+                self.stats["source"].record(len(batch), time.monotonic() - start)
+                offer(output, (sequence, batch[-1].get(self.checkpoint_field), batch))
+                sequence += 1
+
+    def _transform(self, item: tuple) -> tuple:
+        sequence, value, batch = item
+        if self.transform:
+            start = time.monotonic()
+            batch = [row for row in map(self.transform, batch) if row is not None]
+            self.stats["transform"].record(len(batch), time.monotonic() - start)
+        return sequence, value, batch
+
+    def _write(self, item: tuple) -> tuple:
+        sequence, value, batch = item
+        if batch:
+            start = time.monotonic()
+            self.sink.write(batch)
+            self.stats["sink"].record(len(batch), time.monotonic() - start)
+        return sequence, value
+
+    def run(self) -> dict:
+        batches = queue.Queue(maxsize=self.queue_size)
+        transformed = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors: list[BaseException] = []
+
+        completed: dict[int, Any] = {}
+        next_sequence = 0
+        progress = threading.Lock()
+
+        def offer(target: queue.Queue, item: Any) -> None:
+            # Never block forever on a full queue once another stage has failed
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def take(source: queue.Queue) -> Any:
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _STAGE_DONE
+
+        def advance(sequence: int, value: Any) -> None:
+            nonlocal next_sequence
+            with progress:
+                completed[sequence] = value
+                moved = False
+                while next_sequence in completed:
+                    self.last_value = completed.pop(next_sequence)
+                    next_sequence += 1
+                    moved = True
+                if moved and self.checkpoint and self.last_value is not None:
+                    self.checkpoint.save(self.last_value)
+
+        def guarded(target: Callable[[], None]) -> Callable[[], None]:
+            def run() -> None:
+                try:
+                    target()
+                except BaseException as error:
+                    errors.append(error)
+                    stop.set()
+
+            return run
+
+        def read() -> None:
+            try:
+                self._read(batches, stop, offer)
+            finally:
+                for _ in range(self.transform_workers):
+                    offer(batches, _STAGE_DONE)
+
+        def transform_worker() -> None:
+            while (item := take(batches)) is not _STAGE_DONE:
+                offer(transformed, self._transform(item))
+
+        def sink_worker() -> None:
+            while (item := take(transformed)) is not _STAGE_DONE:
+                advance(*self._write(item))
+
+        source_thread = threading.Thread(target=guarded(read), daemon=True)
+        transform_threads = [
+            threading.Thread(target=guarded(transform_worker), daemon=True)
+            for _ in range(self.transform_workers)
+        ]
+        sink_threads = [
+            threading.Thread(target=guarded(sink_worker), daemon=True)
+            for _ in range(self.sink_workers)
+        ]
+
+        for thread in [source_thread, *transform_threads, *sink_threads]:
+            thread.start()
+        try:
+            source_thread.join()
+            self.stats["source"].finished = time.monotonic()
+            for thread in transform_threads:
+                thread.join()
+            self.stats["transform"].finished = time.monotonic()
+            for _ in range(self.sink_workers):
+                offer(transformed, _STAGE_DONE)
+            for thread in sink_threads:
+                thread.join()
+            if not errors:
+                self.sink.close()
+            self.stats["sink"].finished = time.monotonic()
+        finally:
+            stop.set()
+
+        if errors:
+            raise errors[0]
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            "checkpoint": json.loads(json_util.dumps({"value": self.last_value}))["value"],
+            "stages": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
@@ -1,6 +1,15 @@
+import threading
+import time
+from typing import Any, Iterable, Iterator, Sequence
+
 from clickhouse_connect import get_client
 from typica import BaseConnection, ConnectionMeta, ConnectionUriMeta
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class CHRepository(BaseConnection):
     def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
@@ -16,3 +25,202 @@ class CHRepository(BaseConnection):
 
     def close(self):
         self.client.close()
+
+    def iter_rows(
+        self,
+        query: str,
+        parameters: dict | Sequence = None,
+        settings: dict = None,
+        blocks: bool = False,
+    ) -> Iterator[tuple | Sequence[tuple]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            with self.client.query_row_block_stream(
+                query, parameters=parameters, settings=settings
+            ) as stream:
+                for block in stream:
+                    if blocks:
+                        yield block
+                    else:
+                        yield from block
+        except Exception:
+            raise
+
+    def iter_columns(
+        self,
+        query: str,
+        parameters: dict | Sequence = None,
+        settings: dict = None,
+        numpy: bool = True,
+    ) -> Iterator[dict[str, Any]]:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+            if numpy and np is None:
+                raise ImportError("iter_columns requires numpy to be installed")
+
+            with self.client.query_column_block_stream(
+                query, parameters=parameters, settings=settings
+            ) as stream:
+                names = stream.source.column_names
+                for block in stream:
+                    yield {
+                        name: np.asarray(column) if numpy else column
+                        for name, column in zip(names, block)
+                    }
+        except Exception:
+            raise
+
+    def insert_columns(
+        self,
+        table: str,
+        columns: dict[str, Sequence],
+        database: str = None,
+        settings: dict = None,
+    ):
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            return self.client.insert(
+                table,
+                [
+                    column.tolist() if hasattr(column, "tolist") else column
+                    for column in columns.values()
+                ],
+                column_names=list(columns.keys()),
+                database=database,
+                column_oriented=True,
+                settings=settings,
+            )
+        except Exception:
+            raise
+
+    def insert_rows(
+        self,
+        table: str,
+        rows: Iterable[dict | Sequence],
+        column_names: list[str] = None,
+        block_size: int = 100000,
+        async_insert: bool = False,
+        database: str = None,
+        settings: dict = None,
+    ) -> dict:
+        try:
+            if not self.client:
+                raise ValueError("Fail connect")
+
+            with CHBlockWriter(
+                self,
+                table,
+                column_names=column_names,
+                block_size=block_size,
+                async_insert=async_insert,
+                database=database,
+                settings=settings,
+            ) as writer:
+                for row in rows:
+                    writer.add(row)
+            return writer.stats
+        except Exception:
+            raise
+
+
+class CHBlockWriter:
+    def __init__(
+        self,
+        repository: CHRepository,
+        table: str,
+        column_names: list[str] = None,
+        block_size: int = 100000,
+        async_insert: bool = False,
+        database: str = None,
+        settings: dict = None,
+    ) -> None:
+        self.repository = repository
+        self.table = table
+        self.column_names = column_names
+        self.block_size = block_size
+        self.database = database
+        self.settings = dict(settings) if settings else {}
+        if async_insert:
+            self.settings.setdefault("async_insert", 1)
+            self.settings.setdefault("wait_for_async_insert", 1)
+        self.stats = {"rows": 0, "blocks": 0, "elapsed": 0.0, "rowsPerSecond": 0.0}
+        self._columns: list[list] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> "CHBlockWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def add(self, row: dict | Sequence) -> None:
+        if self._closed:
+            raise ValueError("Block writer is closed")
+
+        with self._lock:
+            if self.column_names is None:
+                if not isinstance(row, dict):
+                    raise ValueError("column_names is required for sequence rows")
+                self.column_names = list(row.keys())
+            if isinstance(row, dict):
+                values = [row.get(name) for name in self.column_names]
+            elif len(row) != len(self.column_names):
+                raise ValueError(
+                    f"Row has {len(row)} values, expected {len(self.column_names)}"
+                )
+            else:
+                values = row
+            if self._columns is None:
+                self._columns = [[] for _ in self.column_names]
+            for column, value in zip(self._columns, values):
+                column.append(value)
+            self._size += 1
+            should_flush = self._size >= self.block_size
+        if should_flush:
+            self.flush()
+
+    def add_columns(self, columns: dict[str, Sequence]) -> None:
+        self.flush()
+        start = time.monotonic()
+        self.repository.insert_columns(
+            self.table, columns, database=self.database, settings=self.settings
+        )
+        self._record(len(next(iter(columns.values()), [])), time.monotonic() - start)
+
+    def flush(self) -> None:
+        with self._lock:
+            columns, size = self._columns, self._size
+            self._columns, self._size = None, 0
+        if not size:
+            return
+
+        start = time.monotonic()
+        self.repository.client.insert(
+            self.table,
+            columns,
+            column_names=self.column_names,
+            database=self.database,
+            column_oriented=True,
+            settings=self.settings,
+        )
+        self._record(size, time.monotonic() - start)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+
+    def _record(self, rows: int, elapsed: float) -> None:
+        self.stats["rows"] += rows
+        self.stats["blocks"] += 1
+        self.stats["elapsed"] += elapsed
+        if self.stats["elapsed"]:
+            self.stats["rowsPerSecond"] = self.stats["rows"] / self.stats["elapsed"]
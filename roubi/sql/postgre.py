@@ -1,21 +1,171 @@
-from psycopg2 import connect
+import io
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Sequence
+from uuid import uuid4
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from typica import BaseConnection, ConnectionMeta, ConnectionUriMeta
 
 
+def _copy_field(value: Any) -> str:
+    # COPY csv reads an unquoted empty field as NULL and a quoted one as an empty
+    # string, so every value except None is quoted
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class _CopyReader(io.RawIOBase):
+    def __init__(self, rows: Iterable[Sequence]) -> None:
+        self._rows = iter(rows)
+        self._buffer = bytearray()
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self, size: int) -> None:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                return
+            line = ",".join(map(_copy_field, row)) + "\n"
+            self._buffer += line.encode("utf-8")
+            self.rows += 1
+
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+        if size < 0 or size >= len(self._buffer):
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+        else:
+            chunk = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return chunk
+
+
 class PostgreRepository(BaseConnection):
-    def __init__(self, metadata: ConnectionMeta | ConnectionUriMeta, **kwargs) -> None:
+    def __init__(
+        self,
+        metadata: ConnectionMeta | ConnectionUriMeta,
+        min_connections: int = 1,
+        max_connections: int = 10,
+        **kwargs,
+    ) -> None:
         super().__init__(metadata)
+        if max_connections < 2:
+            # One connection stays checked out for the legacy conn/client attributes
+            raise ValueError("max_connections must be at least 2")
         try:
-            self.conn = connect(
+            self.pool = ThreadedConnectionPool(
+                min_connections,
+                max_connections,
                 **self._metadata.model_dump(
                     exclude={"uri", "type_connection", "clustersUri", "username"}
                 ),
                 user=self._metadata.username,
                 **kwargs,
             )
+            self._slots = threading.BoundedSemaphore(max_connections - 1)
+            self.conn = self.pool.getconn()
             self.client = self.conn.cursor()
         except Exception:
             raise
 
     def close(self):
         self.client.close()
+        self.pool.putconn(self.conn)
+        self.pool.closeall()
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[Any]:
+        if not self._slots.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError("No PostgreSQL connection available in pool")
+        try:
+            conn = self.pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self.pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, name: str = None, itersize: int = 2000, timeout: float = None):
+        with self.connection(timeout=timeout) as conn:
+            with conn.cursor(name=name) as cursor:
+                if name:
+                    cursor.itersize = itersize
+                yield cursor
+
+    def iter_query(
+        self,
+        query: str | sql.Composable,
+        parameters: dict | Sequence = None,
+        itersize: int = 2000,
+        name: str = None,
+    ) -> Iterator[tuple]:
+        try:
+            name = name or f"roubi_{uuid4().hex}"
+            with self.cursor(name=name, itersize=itersize) as cursor:
+                cursor.execute(query, parameters)
+                yield from cursor
+        except Exception:
+            raise
+
+    def execute_batch(
+        self,
+        query: str | sql.Composable,
+        rows: Iterable[Sequence],
+        template: str = None,
+        page_size: int = 1000,
+    ) -> int:
+        try:
+            count = 0
+            with self.cursor() as cursor:
+                page = []
+                for row in rows:
+                    page.append(row)
+                    if len(page) >= page_size:
+                        execute_values(cursor, query, page, template, page_size)
+                        count += cursor.rowcount
+                        page = []
+                if page:
+                    execute_values(cursor, query, page, template, page_size)
+                    count += cursor.rowcount
+            return count
+        except Exception:
+            raise
+
+    def copy_from(
+        self,
+        table: str,
+        rows: Iterable[Sequence],
+        columns: list[str] = None,
+        buffer_size: int = 1 << 16,
+    ) -> int:
+        try:
+            statement = sql.SQL(
+                "COPY {table}{columns} FROM STDIN WITH (FORMAT csv)"
+            ).format(
+                table=sql.Identifier(*table.split(".")),
+                columns=(
+                    sql.SQL(" ({})").format(
+                        sql.SQL(", ").join(map(sql.Identifier, columns))
+                    )
+                    if columns
+                    else sql.SQL("")
+                ),
+            )
+            reader = _CopyReader(rows)
+            with self.cursor() as cursor:
+                cursor.copy_expert(statement, reader, size=buffer_size)
+            return reader.rows
+        except Exception:
+            raise
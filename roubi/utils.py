@@ -0,0 +1,68 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator
+
+
+_READER_DONE = object()
+
+
+class _ReaderError:
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+
+def merge_iterators(
+    readers: list[Callable[[], Iterator[Any]]],
+    workers: int = None,
+    buffer_size: int = None,
+) -> Iterator[Any]:
+    if not readers:
+        return
+
+    workers = min(workers if workers else len(readers), len(readers))
+    buffer = queue.Queue(maxsize=buffer_size if buffer_size else workers * 2)
+    stop = threading.Event()
+
+    def offer(item: Any) -> bool:
+        # Never block forever on a full buffer once the consumer has gone away
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(reader: Callable[[], Iterator[Any]]) -> None:
+        iterator = None
+        try:
+            iterator = reader()
+            for item in iterator:
+                if not offer(item):
+                    return
+        except Exception as e:
+            offer(_ReaderError(e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            offer(_READER_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for reader in readers:
+            executor.submit(run, reader)
+        done = 0
+        while done < len(readers):
+            item = buffer.get()
+            if item is _READER_DONE:
+                done += 1
+            elif isinstance(item, _ReaderError):
+                raise item.error
+            else:
+                yield item
+    finally:
+        # Readers still running see the stop flag at their next offer, waiting for
+        # them lets each close its cursor or scroll before the caller moves on
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)